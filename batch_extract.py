@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Batch image extraction for many property dossiers
+Runs extract_all_images over a directory or glob in a process pool;
+very large decks run one at a time afterwards, so that if their picture
+store is unreadable the signature carving can use every core
+"""
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from extract_all_images import extract_all_images_from_ppt
+
+DECK_EXTENSIONS = ('.ppt', '.pps', '.pot', '.pptx', '.ppsx')
+
+
+def find_decks(target):
+    """Return the deck paths for a directory, a glob pattern (** matches
+    nested folders) or a single file
+    """
+    if os.path.isdir(target):
+        paths = [str(p) for p in Path(target).iterdir()
+                 if p.suffix.lower() in DECK_EXTENSIONS]
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def input_root(target):
+    """Return the folder deck names are relative to: the directory itself,
+    the part of a glob pattern before its first wildcard, or the folder
+    of a single file
+    """
+    if os.path.isdir(target):
+        return target
+    parts = Path(target).parts
+    for i, part in enumerate(parts):
+        if glob.has_magic(part):
+            return str(Path(*parts[:i])) if i else '.'
+    return os.path.dirname(target) or '.'
+
+
+def deck_name(path, root):
+    """Name of a deck in the store and the manifest: its path relative to
+    root, so same-named decks in different folders stay apart
+    """
+    return Path(os.path.relpath(path, root)).as_posix()
+
+
+def extract_decks(deck_paths, output_dir="images_all", workers=None,
+                  shard_size=512 * 1024 * 1024, root='.'):
+    """Extract every deck into one shared image store
+
+    Decks up to shard_size bytes run one per process; larger decks run
+    one at a time after them. Pictures are read from the BLIP store
+    either way; only when that fails (a corrupt or non-OLE deck) is a
+    large deck carved in byte windows across the worker processes.
+    Decks are named by their path relative to root. Returns
+    {deck path: saved count}.
+    """
+    workers = workers or os.cpu_count() or 1
+    small = [p for p in deck_paths if os.path.getsize(p) <= shard_size]
+    large = [p for p in deck_paths if os.path.getsize(p) > shard_size]
+    results = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(extract_all_images_from_ppt, path, output_dir,
+                               deck=deck_name(path, root)): path
+                   for path in small}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                print(f"  ✗ Error extracting {path}: {e}")
+                results[path] = 0
+
+    for path in large:
+        results[path] = extract_all_images_from_ppt(path, output_dir, workers=workers,
+                                                    deck=deck_name(path, root))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extract images from many PowerPoint decks')
+    parser.add_argument('target',
+                        help='Directory of decks or glob pattern (e.g. "dossiers/**/*.ppt")')
+    parser.add_argument('--output', '-o', default='images_all',
+                        help='Output folder (shared content-addressed store)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Worker processes (default: all cores)')
+    parser.add_argument('--shard-size', type=int, default=512,
+                        help='Decks larger than this many MB run one at a time; if their BLIP store '
+                             'is unreadable (corrupt or non-OLE), the fallback carving scans '
+                             'parallel windows')
+
+    args = parser.parse_args()
+
+    decks = find_decks(args.target)
+    if not decks:
+        print(f"Error: no decks found for {args.target}")
+        exit(1)
+
+    print(f"Found {len(decks)} decks")
+    results = extract_decks(decks, args.output, args.jobs, args.shard_size * 1024 * 1024,
+                            input_root(args.target))
+
+    print(f"\n{'='*60}")
+    for path in decks:
+        print(f"  {results.get(path, 0):4d} images  {path}")
+    print(f"  Total: {sum(results.values())} images from {len(decks)} decks")
+    print(f"{'='*60}")
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Incremental build of the whole site
+Runs the pipeline stages (extract, download, watermarks, dedupe,
+variants, gallery, slideshow, publish) as a dependency graph. Each stage is fingerprinted by its
+parameters and the content hashes of its input files; only stages whose
+fingerprint changed run again, and independent stages run in parallel
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from image_carver import mapped
+from image_store import content_hash, load_json, save_merged
+from slideshow_renderer import list_images
+
+PPT_FILE = "DOSSIER FINCA LA PRIORITA 2022.ppt"
+RURALIDAYS_URL = "https://www.ruralidays.com/casas-rurales/COR4327/"
+BUILD_DIR = ".build"
+STATE_FILE = "state.json"
+HASH_CACHE = "hashes.json"
+# Raw deck extractions stay out of the curated images/ folder
+EXTRACT_DIR = "images_all"
+
+
+class Stage:
+    """One build step
+
+    inputs() is called once the stage's dependencies have run and
+    returns the files it reads. run(changed) receives the inputs whose
+    content changed since the last successful run (all of them when the
+    parameters changed) and returns True on success. outputs lists files
+    whose absence forces a re-run. Stages in after run first when they
+    are part of the build, but unlike deps their failure does not skip
+    this one.
+    """
+
+    def __init__(self, name, run, deps=(), inputs=list, params=None, outputs=(), after=()):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.after = tuple(after)
+        self.inputs = inputs
+        self.params = params or {}
+        self.outputs = tuple(outputs)
+
+
+class FileHashes:
+    """Content hashes of input files, cached by size and mtime"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.cache = load_json(self.path)
+        self._dirty = set()
+
+    def __call__(self, file_path):
+        st = os.stat(file_path)
+        cached = self.cache.get(file_path)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['hash']
+        with mapped(file_path) as mm:
+            file_hash = content_hash(mm)
+        self.cache[file_path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': file_hash}
+        self._dirty.add(file_path)
+        return file_hash
+
+    def save(self):
+        self.cache = save_merged(self.path, self.cache, self._dirty)
+        self._dirty.clear()
+
+
+def params_fingerprint(params):
+    return hashlib.blake2b(json.dumps(params, sort_keys=True).encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def plan(stages, targets):
+    """Return the names of targets and everything they depend on, in
+    dependency order
+    """
+    order = []
+    seen = set()
+
+    def visit(name, path=()):
+        if name in path:
+            raise ValueError(f"dependency cycle: {' -> '.join(path + (name,))}")
+        if name in seen:
+            return
+        for dep in stages[name].deps + stages[name].after:
+            visit(dep, path + (name,))
+        seen.add(name)
+        order.append(name)
+
+    for name in targets:
+        visit(name)
+    return order
+
+
+def build(stages, targets=None, force=False, jobs=None, dry_run=False):
+    """Run the stages needed for targets (default: all)
+
+    Returns {stage name: 'ran', 'up to date', 'failed', 'skipped' or
+    (dry run) 'would run'}.
+    """
+    build_dir = Path(BUILD_DIR)
+    build_dir.mkdir(exist_ok=True)
+    state_path = build_dir / STATE_FILE
+    state = load_json(state_path)
+    hashes = FileHashes(build_dir / HASH_CACHE)
+    order = plan(stages, targets or list(stages))
+    results = {}
+
+    def prepare(stage):
+        """Return (changed inputs, new state) or None if up to date"""
+        files = {path: hashes(path) for path in stage.inputs() if os.path.isfile(path)}
+        params = params_fingerprint(stage.params)
+        previous = state.get(stage.name)
+        if (not force and previous and previous['params'] == params
+                and previous['files'] == files
+                and all(os.path.exists(path) for path in stage.outputs)):
+            return None
+        if force or not previous or previous['params'] != params:
+            changed = sorted(files)
+        else:
+            changed = sorted(path for path, file_hash in files.items()
+                             if previous['files'].get(path) != file_hash)
+        return changed, {'params': params, 'files': files}
+
+    pending = list(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs or len(order) or 1) as pool:
+        while pending or running:
+            for name in list(pending):
+                stage = stages[name]
+                if any(results.get(dep) in ('failed', 'skipped') for dep in stage.deps):
+                    results[name] = 'skipped'
+                    pending.remove(name)
+                    print(f"  - {name}: skipped (dependency failed)")
+                    continue
+                if not all(dep in results for dep in stage.deps + stage.after):
+                    continue
+                pending.remove(name)
+
+                prepared = prepare(stage)
+                if prepared is None:
+                    results[name] = 'up to date'
+                    print(f"  ✓ {name}: up to date")
+                    continue
+                changed, new_state = prepared
+                if dry_run:
+                    results[name] = 'would run'
+                    print(f"  * {name}: would run ({len(changed)} changed inputs)")
+                    continue
+                print(f"  → {name}: running ({len(changed)} changed inputs)")
+                running[pool.submit(stage.run, changed)] = (name, new_state)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, new_state = running.pop(future)
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    print(f"  ✗ {name}: {e}")
+                    ok = False
+                if ok:
+                    # Inputs are hashed again: a stage may rewrite its own inputs
+                    new_state['files'] = {path: hashes(path) for path in new_state['files']
+                                          if os.path.isfile(path)}
+                    state[name] = new_state
+                    state = save_merged(state_path, state, [name])
+                    results[name] = 'ran'
+                    print(f"  ✓ {name}: done")
+                else:
+                    results[name] = 'failed'
+                    print(f"  ✗ {name}: failed")
+
+    hashes.save()
+    return results
+
+
+# Site stages
+
+def _extract(changed):
+    if not os.path.exists(PPT_FILE):
+        # The deck is not in the repo; without it there is nothing to extract
+        print(f"{PPT_FILE} not found, nothing to extract")
+        return True
+    from extract_images import extract_images_from_ppt
+    extract_images_from_ppt(PPT_FILE, EXTRACT_DIR)
+    return True
+
+
+def _download(changed):
+    from download_ruralidays_images import extract_images_from_ruralidays
+    results = extract_images_from_ruralidays(RURALIDAYS_URL)
+    # Not modified counts as success: a fully cached listing is up to date
+    return bool(results) and all(result['ok'] for result in results)
+
+
+def _remove_watermarks(changed):
+    from remove_watermarks import remove_watermark_manual_mask
+    output_dir = Path("images_ruralidays_clean")
+    output_dir.mkdir(exist_ok=True)
+    ok = True
+    for path in map(Path, changed):
+        output_file = output_dir / f"{path.stem}_no_watermark{path.suffix}"
+        ok = remove_watermark_manual_mask(path, output_file) and ok
+    return ok
+
+
+def _dedupe(changed):
+    from image_dedupe import compute_hashes, find_duplicates, protected_images, write_report
+    groups, _ = find_duplicates(compute_hashes(list_images("images_ruralidays") + list_images("images")))
+    dropped = write_report(groups, protected_images())
+    print(f"{len(groups)} groups of near-duplicates, {len(dropped)} images skipped")
+    return True
+
+
+def _variants(changed):
+    from image_dedupe import load_dropped
+    from image_variants import build_placeholders, build_variants
+    dropped = load_dropped()
+    sources = [path for path in list_images("images") + list_images("images_ruralidays")
+               if path not in dropped]
+    build_variants(sources)
+    build_placeholders(sources)
+    return True
+
+
+def _gallery(changed):
+    from gallery_manifest import build_manifest
+    build_manifest()
+    return True
+
+
+def _slideshow(changed):
+    from generate_slideshow import generate_slideshow_with_images
+    generate_slideshow_with_images("images", "dossier.html", PPT_FILE)
+    return True
+
+
+def _publish(changed):
+    from publish import publish
+    publish()
+    return True
+
+
+def site_stages():
+    """Return {name: Stage} for the site pipeline"""
+    stages = [
+        Stage('extract', _extract, inputs=lambda: [PPT_FILE],
+              params={'output': EXTRACT_DIR}),
+        Stage('download', _download, params={'url': RURALIDAYS_URL},
+              outputs=["images_ruralidays"]),
+        # The image folders are committed, so a failed (or offline) download
+        # only means working from the images already there
+        Stage('watermarks', _remove_watermarks, after=['download'],
+              inputs=lambda: list_images("images_ruralidays"),
+              params={'output': "images_ruralidays_clean"}),
+        Stage('dedupe', _dedupe, after=['download'],
+              inputs=lambda: list_images("images_ruralidays") + list_images("images"),
+              params={'output': "images_web/duplicates.json"},
+              outputs=["images_web/duplicates.json"]),
+        Stage('variants', _variants, deps=['dedupe'],
+              inputs=lambda: (list_images("images") + list_images("images_ruralidays")
+                              + ["images_web/duplicates.json"]),
+              params={'output': "images_web"}),
+        Stage('gallery', _gallery, deps=['dedupe', 'variants'],
+              inputs=lambda: (list_images("images_ruralidays") + list_images("images")
+                              + ["images_web/variants.json", "images_web/duplicates.json"]),
+              params={'output': "gallery"}, outputs=["gallery/index.json", "gallery/index.js"]),
+        Stage('slideshow', _slideshow, deps=['extract', 'variants'],
+              inputs=lambda: [PPT_FILE] + list_images("images"),
+              params={'output': "dossier.html"}, outputs=["dossier.html"]),
+        Stage('publish', _publish, deps=['gallery', 'slideshow'],
+              inputs=lambda: (["index.html", "dossier.html"]
+                              + [str(p) for p in sorted(Path("gallery").glob("*.json"))]
+                              + list_images("images") + list_images("images_ruralidays")
+                              + list_images("images_all")
+                              + [str(p) for p in sorted(Path("images_web").glob("*.webp"))]),
+              params={'output': "dist"}, outputs=["dist/asset-manifest.json"]),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+if __name__ == "__main__":
+    stages = site_stages()
+    parser = argparse.ArgumentParser(description='Incremental build of the site')
+    parser.add_argument('targets', nargs='*',
+                        help=f"Stages to build with their dependencies: {', '.join(stages)} (default: all)")
+    parser.add_argument('--force', '-f', action='store_true',
+                        help='Run the stages even if nothing changed')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Stages run at the same time (default: all ready stages)')
+    parser.add_argument('--dry-run', '-n', action='store_true',
+                        help='Only show which stages would run')
+
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in stages]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    results = build(stages, args.targets, args.force, args.jobs, args.dry_run)
+    print(f"\n{'='*60}")
+    for name, result in results.items():
+        print(f"  {name:12s} {result}")
+    print(f"{'='*60}")
+    if 'failed' in results.values():
+        exit(1)
@@ -1,123 +1,56 @@
 #!/usr/bin/env python3
-from pptx import Presentation
-import html
+import sys
 
-def extract_ppt_content(ppt_path):
-    """Extract content from PowerPoint file"""
-    prs = Presentation(ppt_path)
-    slides_data = []
-    
-    for i, slide in enumerate(prs.slides):
-        slide_content = {
-            'title': '',
-            'text': [],
-            'notes': ''
-        }
-        
-        # Extract text from shapes
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text.strip():
-                text = shape.text.strip()
-                # Check if it's a title (usually first shape or has title formatting)
-                if not slide_content['title'] and len(text) < 100:
-                    slide_content['title'] = text
-                else:
-                    slide_content['text'].append(text)
-        
-        # Extract notes
-        if slide.has_notes_slide:
-            notes_slide = slide.notes_slide
-            if notes_slide.notes_text_frame:
-                slide_content['notes'] = notes_slide.notes_text_frame.text
-        
-        slides_data.append(slide_content)
-    
-    return slides_data
+from image_store import ImageStore
+from image_variants import build_placeholders, build_variants
+from ppt_reader import read_deck
+from pptx_media import is_ooxml, read_slides
+from slideshow_renderer import list_images, write_dossier
 
-def create_reveal_html(slides_data, output_path):
-    """Create Reveal.js HTML from slides data"""
-    
-    html_content = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Finca La Priorita - Dossier 2022</title>
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/reveal.js@4.3.1/dist/reveal.css">
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/reveal.js@4.3.1/dist/theme/white.css">
-    <style>
-        .reveal .slides section {
-            text-align: left;
-        }
-        .reveal h1, .reveal h2, .reveal h3 {
-            color: #2c3e50;
-        }
-        .reveal .slides section .fragment {
-            opacity: 0;
-        }
-        .reveal .slides section .fragment.visible {
-            opacity: 1;
-        }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        }
-    </style>
-</head>
-<body>
-    <div class="reveal">
-        <div class="slides">
-'''
-    
-    for slide in slides_data:
-        html_content += '            <section>\n'
-        
-        if slide['title']:
-            html_content += f'                <h2>{html.escape(slide["title"])}</h2>\n'
-        
-        if slide['text']:
-            for text in slide['text']:
-                if text and text != slide['title']:
-                    # Split long text into paragraphs
-                    paragraphs = text.split('\n')
-                    for para in paragraphs:
-                        if para.strip():
-                            html_content += f'                <p>{html.escape(para.strip())}</p>\n'
-        
-        html_content += '            </section>\n'
-    
-    html_content += '''        </div>
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/reveal.js@4.3.1/dist/reveal.js"></script>
-    <script>
-        Reveal.initialize({
-            hash: true,
-            controls: true,
-            progress: true,
-            center: true,
-            touch: true,
-            transition: 'slide'
-        });
-    </script>
-</body>
-</html>'''
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print(f"Created {output_path} with {len(slides_data)} slides")
+# Slide pictures are stored apart from the curated images/ folder, which
+# the renderer only reads
+SLIDE_PICTURES_DIR = "images_all"
+
+def slide_pictures(slides_data):
+    """Return the stored pictures the slides show, in order"""
+    return list(dict.fromkeys(image for slide in slides_data for image in slide.get('images', [])))
+
+def extract_ppt_content(ppt_path, image_dir=None):
+    """Extract content from PowerPoint file
+    
+    Slide text, notes and pictures are read in one pass, straight from
+    the zip for .pptx packages and from the record tree for binary .ppt;
+    with image_dir the pictures go into that image store and each slide
+    lists its stored images.
+    """
+    if is_ooxml(ppt_path):
+        store = ImageStore(image_dir) if image_dir else None
+        return read_slides(ppt_path, store)
+    
+    # Binary .ppt: text, notes and pictures come from one walk over the
+    # compound file's record tree
+    store = ImageStore(image_dir) if image_dir else None
+    slides_data, _ = read_deck(ppt_path, store)
+    return slides_data
 
 if __name__ == "__main__":
     ppt_file = "DOSSIER FINCA LA PRIORITA 2022.ppt"
     output_file = "dossier.html"
+    # --offline: self-contained, minified page with reveal.js inlined
+    offline = '--offline' in sys.argv[1:]
     
     print(f"Extracting content from {ppt_file}...")
-    slides_data = extract_ppt_content(ppt_file)
+    slides_data = extract_ppt_content(ppt_file, image_dir=SLIDE_PICTURES_DIR)
     print(f"Found {len(slides_data)} slides")
     
+    # The images in images/ get slides of their own, so this and
+    # generate_slideshow.py write the same merged dossier
     print(f"Creating web slideshow: {output_file}...")
-    create_reveal_html(slides_data, output_file)
+    image_files = list_images("images")
+    sources = image_files + slide_pictures(slides_data)
+    slide_count = write_dossier(output_file, slides_data, image_files,
+                                variants=build_variants(sources),
+                                placeholders=build_placeholders(sources),
+                                offline=offline)
+    print(f"Created {output_file} with {slide_count} slides")
     print("Done!")
-
-
-
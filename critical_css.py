@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Critical CSS and minification for the self-contained dossier
+Prunes stylesheets down to the rules whose selectors can match the
+generated markup (or anything the page's scripts may add), and minifies
+CSS and HTML
+"""
+import re
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+_ID_RE = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+_TAG_RE = re.compile(r'(?:^|[\s>+~(])([a-zA-Z][a-zA-Z0-9]*)')
+# Pseudo-classes, pseudo-elements and attribute selectors never rule a
+# selector out, so they are dropped before matching
+_IGNORED_RE = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]')
+_HTML_CLASS_RE = re.compile(r'\sclass="([^"]*)"')
+_HTML_ID_RE = re.compile(r'\sid="([^"]*)"')
+_HTML_TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+_JS_WORD_RE = re.compile(r'[_a-zA-Z][\w-]*')
+_JS_STRING_RE = re.compile(r'"([^"\\\n]*)"|\'([^\'\\\n]*)\'|`([^`\\]*)`')
+# Strings and url() are set aside while minifying so nothing in them is
+# touched; comments go
+_CSS_LITERAL_RE = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|url\([^)]*\))|/\*.*?\*/', re.S | re.I)
+_CSS_PLACEHOLDER_RE = re.compile(r'\x00(\d+)\x00')
+_CSS_BLOCK_RE = re.compile(r'\s*([{};])\s*')
+# A space before ':' in a selector is a descendant combinator
+# (.a ::selection) and '+' inside calc() needs its spaces, so only
+# combinators and commas lose theirs
+_SELECTOR_SPACE_RE = re.compile(r'\s*([,>+~])\s*')
+_COMMA_SPACE_RE = re.compile(r'\s*,\s*')
+_DECLARATION_RE = re.compile(r'([-\w]+)\s*:\s*')
+_HTML_TAG_TOKEN_RE = re.compile(r'(<[^>]*>)')
+# Whitespace next to these tags never renders
+_HTML_BLOCK_TAGS = frozenset([
+    'html', 'head', 'body', 'title', 'meta', 'link', 'script', 'style', 'div', 'section', 'p', 'pre',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'table', 'tr', 'td', 'th', 'br'])
+_HTML_TAG_NAME_RE = re.compile(r'</?([a-zA-Z][a-zA-Z0-9]*)')
+_SCRIPT_STYLE_RE = re.compile(r'(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2>)', re.S | re.I)
+
+
+class UsedNames:
+    """Classes, ids and tag names a page can contain"""
+
+    def __init__(self):
+        self.classes = set()
+        self.ids = set()
+        self.tags = {'html', 'body'}
+
+    def add_html(self, markup):
+        for value in _HTML_CLASS_RE.findall(markup):
+            self.classes.update(value.split())
+        self.ids.update(_HTML_ID_RE.findall(markup))
+        self.tags.update(tag.lower() for tag in _HTML_TAG_RE.findall(markup))
+
+    def add_script(self, source):
+        """Count every word of every string literal in source as a class,
+        id and tag name the script may create; generous, but it keeps
+        everything a library like reveal.js adds at runtime
+        """
+        for groups in _JS_STRING_RE.findall(source):
+            for word in _JS_WORD_RE.findall(''.join(groups)):
+                self.classes.add(word)
+                self.ids.add(word)
+                self.tags.add(word.lower())
+
+    def matches(self, selector):
+        """False only if selector needs a name the page can never contain"""
+        selector = _IGNORED_RE.sub('', selector)
+        return (all(name in self.classes for name in _CLASS_RE.findall(selector))
+                and all(name in self.ids for name in _ID_RE.findall(selector))
+                and all(tag.lower() in self.tags for tag in _TAG_RE.findall(selector)))
+
+
+def _split_blocks(css):
+    """Yield (prelude, body) for the top-level blocks of css; body is None
+    for statements such as @charset
+    """
+    pos = 0
+    length = len(css)
+    while pos < length:
+        brace = css.find('{', pos)
+        semi = css.find(';', pos)
+        if brace == -1 and semi == -1:
+            return
+        if semi != -1 and (brace == -1 or semi < brace):
+            yield css[pos:semi].strip(), None
+            pos = semi + 1
+            continue
+        depth = 1
+        end = brace + 1
+        while end < length and depth:
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+            end += 1
+        yield css[pos:brace].strip(), css[brace + 1:end - 1]
+        pos = end
+
+
+def prune_css(css, used):
+    """Return css without the rules none of whose selectors can match
+
+    @media and @supports blocks are pruned recursively and dropped when
+    empty; @import is dropped (everything is inlined); other at-rules
+    (@font-face, @keyframes, ...) are kept as they are.
+    """
+    out = []
+    for prelude, body in _split_blocks(_COMMENT_RE.sub('', css)):
+        if not prelude:
+            continue
+        if body is None:
+            if not prelude.startswith('@import'):
+                out.append(prelude + ';')
+        elif prelude.startswith(('@media', '@supports')):
+            inner = prune_css(body, used)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            out.append(f"{prelude}{{{body}}}")
+        else:
+            selectors = [s.strip() for s in prelude.split(',') if used.matches(s.strip())]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+    return minify_css('\n'.join(out))
+
+
+def minify_css(css):
+    """Strip comments and the whitespace CSS does not need
+
+    Selectors only lose the spaces around commas and combinators, at-rule
+    preludes around commas, and declarations around their first colon
+    and commas; spaces anywhere else (calc(), var() fallbacks, selectors
+    like .a ::b) are collapsed but kept.
+    """
+    literals = []
+
+    def set_aside(match):
+        if match.group(1) is None:
+            return ' '
+        literals.append(match.group(1))
+        return f"\x00{len(literals) - 1}\x00"
+
+    css = ' '.join(_CSS_LITERAL_RE.sub(set_aside, css).split())
+    pieces = _CSS_BLOCK_RE.split(css)
+    out = []
+    for i in range(0, len(pieces), 2):
+        text = pieces[i]
+        delimiter = pieces[i + 1] if i + 1 < len(pieces) else ''
+        if text.startswith('@'):
+            text = _COMMA_SPACE_RE.sub(',', text)
+        elif delimiter == '{':
+            text = _SELECTOR_SPACE_RE.sub(r'\1', text)
+        elif text:
+            text = _COMMA_SPACE_RE.sub(',', _DECLARATION_RE.sub(r'\1:', text, count=1))
+        out.append(text + delimiter)
+    css = ''.join(out).replace(';}', '}')
+    return _CSS_PLACEHOLDER_RE.sub(lambda match: literals[int(match.group(1))], css)
+
+
+def _minify_script(source):
+    # Only drops indentation, blank lines and whole-line // comments;
+    # anything else in a script is left as written
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def _collapse_gaps(markup):
+    """Collapse every whitespace run outside tags to one space, dropped
+    where it touches a block-level or head element or the edge of markup
+    """
+    parts = _HTML_TAG_TOKEN_RE.split(markup)
+    for i in range(0, len(parts), 2):
+        text = parts[i]
+        if not text:
+            continue
+        words = ' '.join(text.split())
+        lead = text[0].isspace() and i > 0 and not _block_tag(parts[i - 1])
+        trail = text[-1].isspace() and i + 1 < len(parts) and not _block_tag(parts[i + 1])
+        if not words:
+            parts[i] = ' ' if lead and trail else ''
+        else:
+            parts[i] = (' ' if lead else '') + words + (' ' if trail else '')
+    return ''.join(parts)
+
+
+def _block_tag(tag):
+    match = _HTML_TAG_NAME_RE.match(tag)
+    return match is None or match.group(1).lower() in _HTML_BLOCK_TAGS
+
+
+def minify_html(markup):
+    """Collapse the whitespace between tags and inside inline styles and
+    scripts of a complete fragment of markup; text keeps its words and
+    the single spaces between them, pre and textarea are left as they are
+    """
+    parts = []
+    pos = 0
+    for match in _SCRIPT_STYLE_RE.finditer(markup):
+        parts.append(_collapse_gaps(markup[pos:match.start()]))
+        open_tag, tag, body, close_tag = match.groups()
+        tag = tag.lower()
+        if tag == 'style':
+            body = minify_css(body)
+        elif tag == 'script':
+            body = _minify_script(body)
+        parts.append(open_tag + body + close_tag)
+        pos = match.end()
+    parts.append(_collapse_gaps(markup[pos:]))
+    return ''.join(parts)
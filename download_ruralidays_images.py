@@ -3,128 +3,85 @@
 Script to download images from Ruralidays property gallery
 """
 import os
-import requests
-from bs4 import BeautifulSoup
 import re
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
-def download_image(url, save_path):
-    """Download an image from URL to save_path"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
-        return True
-    except Exception as e:
-        print(f"Error downloading {url}: {e}")
-        return False
+from image_downloader import CACHE_INDEX, CHUNK_SIZE, WORKERS, DownloadCache, download_all, make_session
+from url_harvester import harvest
 
-def extract_images_from_ruralidays(url):
-    """Extract all images from Ruralidays property page"""
-    output_dir = Path("images_ruralidays")
+def extract_images_from_ruralidays(url, output_dir="images_ruralidays", workers=WORKERS):
+    """Extract all images from Ruralidays property page
+    
+    The page and every image go through one pooled session; images are
+    downloaded concurrently. downloads.json in output_dir remembers each
+    image's file and validators, so a re-run only revalidates them.
+    Returns the download_all results.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(exist_ok=True)
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    session = make_session(workers)
     
     print(f"Fetching {url}...")
-    response = requests.get(url, headers=headers, timeout=30)
-    response.raise_for_status()
-    
-    html_content = response.text
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # Collect all image URLs
-    image_urls = set()
-    
-    # Method 1: Find by id="gallery-images" and all nested images
-    gallery = soup.find(id="gallery-images")
-    if gallery:
-        print("Found gallery-images container")
-        img_tags = gallery.find_all('img')
-        for img in img_tags:
-            for attr in ['src', 'data-src', 'data-lazy-src', 'data-original', 'data-full']:
-                src = img.get(attr)
-                if src:
-                    image_urls.add(src)
-    
-    # Method 2: Search for image URLs in script tags (often stored as JSON)
-    script_tags = soup.find_all('script')
-    for script in script_tags:
-        if script.string:
-            # Look for URLs ending in .jpg, .jpeg, .png, .webp
-            urls = re.findall(r'https?://[^\s"\'<>]+\.(?:jpg|jpeg|png|webp)(?:\?[^\s"\'<>]*)?', script.string, re.IGNORECASE)
-            image_urls.update(urls)
-            # Also look for relative paths
-            rel_urls = re.findall(r'/[^\s"\'<>]+\.(?:jpg|jpeg|png|webp)(?:\?[^\s"\'<>]*)?', script.string, re.IGNORECASE)
-            image_urls.update(rel_urls)
-    
-    # Method 3: Find all img tags with various data attributes
-    all_imgs = soup.find_all('img')
-    for img in all_imgs:
-        for attr in ['src', 'data-src', 'data-lazy-src', 'data-original', 'data-full', 'data-image']:
-            src = img.get(attr)
-            if src:
-                image_urls.add(src)
-    
-    # Method 4: Search HTML content directly for image URLs
-    html_urls = re.findall(r'https?://[^\s"\'<>]+\.(?:jpg|jpeg|png|webp)(?:\?[^\s"\'<>]*)?', html_content, re.IGNORECASE)
-    image_urls.update(html_urls)
+    # The page is scanned for image URLs as it downloads: img attributes,
+    # srcset, inline scripts and absolute URLs anywhere in the markup
+    with session.get(url, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = response.encoding or 'utf-8'
+        image_urls = harvest(response.iter_content(CHUNK_SIZE, decode_unicode=True))
     
     # Filter out icons, logos, and small images
     filtered_urls = []
-    for url in image_urls:
-        url_lower = url.lower()
+    for img_url in image_urls:
+        url_lower = img_url.lower()
         # Skip obvious non-property images
         if any(skip in url_lower for skip in ['icon', 'logo', 'star', 'arrow', 'button', 'badge', 'trustpilot']):
             continue
         # Prefer larger images (look for size indicators or CDN patterns)
         if any(indicator in url_lower for indicator in ['large', 'full', 'original', 'photo', 'image', 'property', 'casa']):
-            filtered_urls.append(url)
+            filtered_urls.append(img_url)
         elif '.jpg' in url_lower or '.jpeg' in url_lower or '.png' in url_lower:
             # Include if it looks like a property photo URL
             if not any(skip in url_lower for skip in ['thumb', 'small', 'mini']):
-                filtered_urls.append(url)
+                filtered_urls.append(img_url)
     
     print(f"Found {len(filtered_urls)} potential property images")
     
-    downloaded = 0
-    for idx, src in enumerate(filtered_urls, 1):
-        # Make absolute URL
+    # Make absolute URLs; relative and absolute spellings of one image count once
+    absolute_urls = set()
+    for src in filtered_urls:
         if src.startswith('//'):
             src = 'https:' + src
-        elif src.startswith('/'):
-            src = urljoin(url, src)
         elif not src.startswith('http'):
             src = urljoin(url, src)
-        
-        # Get file extension
-        parsed = urlparse(src)
-        path = parsed.path
-        # Remove query parameters for extension detection
-        path_clean = path.split('?')[0]
-        ext = os.path.splitext(path_clean)[1] or '.jpg'
-        
-        # Clean filename
-        filename = f"ruralidays_{idx:03d}{ext}"
-        save_path = output_dir / filename
-        
-        print(f"[{idx}/{len(filtered_urls)}] Downloading: {src[:80]}...")
-        if download_image(src, save_path):
-            downloaded += 1
-            print(f"  ✓ Saved to {save_path}")
-        else:
-            print(f"  ✗ Failed")
+        absolute_urls.add(src)
+    
+    # Images downloaded before keep their file; new ones are numbered after
+    # the highest number in use, in the index or on disk, in URL order so
+    # the names do not depend on set iteration order
+    cache = DownloadCache(output_dir / CACHE_INDEX)
+    names = cache.paths() | {entry.name for entry in output_dir.iterdir()}
+    used = [int(m.group(1)) for name in names
+            for m in [re.match(r'\.?ruralidays_(\d+)', name)] if m]
+    next_idx = max(used, default=0) + 1
+    
+    jobs = []
+    for src in sorted(absolute_urls):
+        save_path = cache.local_path(src)
+        if save_path is None:
+            # Get file extension (urlparse keeps the query out of the path)
+            ext = os.path.splitext(urlparse(src).path)[1] or '.jpg'
+            save_path = output_dir / f"ruralidays_{next_idx:03d}{ext}"
+            next_idx += 1
+        jobs.append((src, save_path))
+    
+    results = download_all(jobs, workers=workers, session=session, cache=cache)
+    downloaded = sum(1 for result in results if result['ok'] and result['status'] != 'not modified')
+    unchanged = sum(1 for result in results if result['status'] == 'not modified')
     
-    print(f"\n✓ Downloaded {downloaded} images to {output_dir}/")
-    return downloaded
+    print(f"\n✓ Downloaded {downloaded} images to {output_dir}/ ({unchanged} unchanged)")
+    return results
 
 if __name__ == "__main__":
     url = "https://www.ruralidays.com/casas-rurales/COR4327/"
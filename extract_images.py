@@ -4,16 +4,19 @@ import re
 import struct
 from pathlib import Path
 
-def extract_images_from_ppt(ppt_path, output_dir="images"):
-    """Extract images from old .ppt format"""
-    
-    # Create output directory
-    os.makedirs(output_dir, exist_ok=True)
-    
-    print(f"Reading {ppt_path}...")
-    
-    with open(ppt_path, 'rb') as f:
-        content = f.read()
+from extraction_manifest import ExtractionManifest
+from image_carver import jpeg_end as find_jpeg_end
+from image_carver import png_end as find_png_end
+from image_carver import mapped
+from image_store import ImageStore
+from ppt_reader import read_pictures
+from pptx_media import extract_media, is_ooxml
+
+# Key of this extractor's results in the extraction manifest
+EXTRACTOR = "extract_images"
+
+def carve_signatures(content):
+    """Find images in raw deck bytes by their signatures"""
     
     # Common image signatures
     image_signatures = {
@@ -25,6 +28,8 @@ def extract_images_from_ppt(ppt_path, output_dir="images"):
         b'RIFF': 'webp',  # May need more checking
     }
     
+    # Slices of the view reference the mapped file instead of copying it
+    view = memoryview(content)
     images_found = []
     offset = 0
     
@@ -34,11 +39,10 @@ def extract_images_from_ppt(ppt_path, output_dir="images"):
         if jpeg_start == -1:
             break
         
-        # Find JPEG end
-        jpeg_end = content.find(b'\xff\xd9', jpeg_start)
-        if jpeg_end != -1:
-            jpeg_end += 2
-            img_data = content[jpeg_start:jpeg_end]
+        # Walk the JPEG markers to its real EOI
+        jpeg_end = find_jpeg_end(content, jpeg_start)
+        if jpeg_end is not None:
+            img_data = view[jpeg_start:jpeg_end]
             if len(img_data) > 1000:  # Minimum size filter
                 images_found.append(('jpg', jpeg_start, img_data))
             offset = jpeg_end
@@ -52,11 +56,10 @@ def extract_images_from_ppt(ppt_path, output_dir="images"):
         if png_start == -1:
             break
         
-        # PNG has IEND marker
-        png_end = content.find(b'IEND\xaeB`\x82', png_start)
-        if png_end != -1:
-            png_end += 8
-            img_data = content[png_start:png_end]
+        # Walk the PNG chunks up to IEND
+        png_end = find_png_end(content, png_start)
+        if png_end is not None:
+            img_data = view[png_start:png_end]
             if len(img_data) > 100:  # Minimum size filter
                 images_found.append(('png', png_start, img_data))
             offset = png_end
@@ -80,13 +83,53 @@ def extract_images_from_ppt(ppt_path, output_dir="images"):
             if gif_end > len(content):
                 gif_end = len(content)
         
-        img_data = content[gif_start:gif_end]
+        img_data = view[gif_start:gif_end]
         if len(img_data) > 100:
             images_found.append(('gif', gif_start, img_data))
         offset = gif_end
         if offset >= len(content):
             break
     
+    return images_found
+
+def extract_images_from_ppt(ppt_path, output_dir="images"):
+    """Extract images from old .ppt format"""
+    
+    # Create output directory
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"Reading {ppt_path}...")
+    
+    # An unchanged deck whose images are all on disk needs no extraction
+    manifest = ExtractionManifest(output_dir, EXTRACTOR)
+    deck_hash = manifest.deck_hash(ppt_path)
+    deck = os.path.basename(ppt_path)
+    store = ImageStore(output_dir)
+    if manifest.verified(deck_hash):
+        manifest.restore_names(deck_hash, deck, store)
+        count = len(manifest.entries(deck_hash))
+        print(f"Already extracted and verified: {count} images (see {output_dir}/manifest.json)")
+        return count
+    
+    if is_ooxml(ppt_path):
+        # .pptx: pictures sit in ppt/media/ already, stream them out of the zip
+        store.forget(deck)
+        entries = extract_media(ppt_path, store, deck)
+        store.save()
+        manifest.record(deck_hash, deck, entries)
+        manifest.save()
+        print(f"Streamed {len(entries)} media files from the OOXML package to {output_dir}/")
+        return len(entries)
+    
+    try:
+        # Pictures come straight from the PowerPoint BLIP store
+        images_found = read_pictures(ppt_path)
+    except ValueError as e:
+        # Corrupt or non-OLE file: fall back to carving signatures
+        print(f"BLIP store unreadable ({e}), carving signatures instead")
+        with mapped(ppt_path) as content:
+            images_found = carve_signatures(content)
+    
     # Remove duplicates (same position)
     seen_positions = set()
     unique_images = []
@@ -102,23 +145,37 @@ def extract_images_from_ppt(ppt_path, output_dir="images"):
     
     # Save images
     saved_count = 0
+    store.forget(deck)
+    entries = []
+    errors = 0
     for i, (img_type, pos, img_data) in enumerate(unique_images, 1):
         filename = f"image_{i:03d}.{img_type}"
-        filepath = os.path.join(output_dir, filename)
+        
+        # Verify it's a valid image by checking its size
+        if len(img_data) <= 500:  # At least 500 bytes
+            continue
         
         try:
-            with open(filepath, 'wb') as img_file:
-                img_file.write(img_data)
-            
-            # Verify it's a valid image by checking file size
-            if os.path.getsize(filepath) > 500:  # At least 500 bytes
-                print(f"  Saved: {filename} ({len(img_data)} bytes)")
-                saved_count += 1
+            # Written straight from the slice, once per distinct picture
+            name, is_new = store.put(img_data, img_type)
+            store.add_name(deck, filename, name)
+            entries.append({'name': filename, 'offset': pos, 'type': img_type,
+                            'length': len(img_data), 'hash': name.split('.')[0], 'file': name})
+            if is_new:
+                print(f"  Saved: {filename} -> {name} ({len(img_data)} bytes)")
             else:
-                os.remove(filepath)
+                print(f"  Already stored: {filename} -> {name}")
+            saved_count += 1
         except Exception as e:
             print(f"  Error saving {filename}: {e}")
+            errors += 1
+    
+    store.save()
     
+    # Only a clean run is recorded, so failures are retried next time
+    if not errors:
+        manifest.record(deck_hash, deck, entries)
+        manifest.save()
     print(f"\nSuccessfully extracted {saved_count} images to '{output_dir}' directory")
     return saved_count
 
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Persistent manifest of extracted images
+Indexed by extractor and deck content hash; each entry records the
+offset, type, length and content hash of an image and the stored file
+it went to
+"""
+import os
+from pathlib import Path
+
+from image_carver import mapped
+from image_store import content_hash, load_json, save_merged
+
+MANIFEST = "manifest.json"
+
+
+class ExtractionManifest:
+    """Extraction results per deck, kept next to the image store
+
+    Extractors differ in what they find, so each one only sees its own
+    results: a store shared by extract_images and extract_all_images
+    never reports one's partial set as the other's finished extraction.
+    """
+
+    def __init__(self, output_dir, extractor):
+        self.root = Path(output_dir)
+        self.path = self.root / MANIFEST
+        self.extractor = extractor
+        data = load_json(self.path)
+        # 'extractor:deck hash' -> {'deck': name, 'images': [entry, ...]}
+        self.decks = data.get('decks', {})
+        # absolute deck path -> {'size', 'mtime_ns', 'hash'}
+        self.paths = data.get('paths', {})
+        self._dirty_decks = set()
+        self._dirty_paths = set()
+
+    def deck_hash(self, ppt_path):
+        """Return the content hash of a deck
+
+        The hash is cached by path, size and mtime, so an unchanged deck is
+        only stat'ed, never re-read.
+        """
+        key = os.path.abspath(ppt_path)
+        st = os.stat(ppt_path)
+        cached = self.paths.get(key)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['hash']
+
+        with mapped(ppt_path) as mm:
+            deck_hash = content_hash(mm)
+        self.paths[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': deck_hash}
+        self._dirty_paths.add(key)
+        return deck_hash
+
+    def _key(self, deck_hash):
+        return f"{self.extractor}:{deck_hash}"
+
+    def entries(self, deck_hash):
+        """Return the recorded image entries for a deck, or None"""
+        deck = self.decks.get(self._key(deck_hash))
+        return deck['images'] if deck else None
+
+    def missing(self, deck_hash):
+        """Return the entries whose stored file is gone or has the wrong size"""
+        missing = []
+        for entry in self.entries(deck_hash) or []:
+            path = self.root / entry['file']
+            try:
+                if path.stat().st_size == entry['length']:
+                    continue
+            except FileNotFoundError:
+                pass
+            missing.append(entry)
+        return missing
+
+    def verified(self, deck_hash):
+        """True if the deck was extracted and every image file is intact"""
+        return self.entries(deck_hash) is not None and not self.missing(deck_hash)
+
+    def restore_names(self, deck_hash, deck_name, store):
+        """Point the store's names for deck_name at the recorded images"""
+        store.forget(deck_name)
+        for entry in self.entries(deck_hash):
+            store.add_name(deck_name, entry['name'], entry['file'])
+        store.save()
+
+    def record(self, deck_hash, deck_name, entries):
+        """Replace the entries for a deck
+
+        entries are dicts with name, offset, type, length, hash and file.
+        """
+        key = self._key(deck_hash)
+        self.decks[key] = {'deck': deck_name, 'images': entries}
+        self._dirty_decks.add(key)
+
+    def save(self):
+        """Write the changed decks and cached deck hashes into the manifest"""
+        keys = ([('decks', key) for key in self._dirty_decks] +
+                [('paths', key) for key in self._dirty_paths])
+        merged = save_merged(self.path, {'decks': self.decks, 'paths': self.paths}, keys)
+        self.decks = merged.get('decks', {})
+        self.paths = merged.get('paths', {})
+        self._dirty_decks.clear()
+        self._dirty_paths.clear()
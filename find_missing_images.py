@@ -1,33 +1,35 @@
 #!/usr/bin/env python3
 import os
-import glob
+import sys
 
-# Get all existing images
-existing = set()
-for img in glob.glob('images/image_*.jpg') + glob.glob('images/image_*.png'):
-    existing.add(os.path.basename(img))
+from extract_all_images import EXTRACTOR
+from extraction_manifest import ExtractionManifest
 
-print(f"Found {len(existing)} existing images")
+ppt_file = sys.argv[1] if len(sys.argv) > 1 else "DOSSIER FINCA LA PRIORITA 2022.ppt"
+images_dir = sys.argv[2] if len(sys.argv) > 2 else "images_all"
 
-# Check for image_040 and image_041
-missing = []
-for i in range(40, 42):
-    for ext in ['jpg', 'png']:
-        filename = f'image_{i:03d}.{ext}'
-        if filename not in existing:
-            missing.append(filename)
+if not os.path.exists(ppt_file):
+    print(f"Error: {ppt_file} not found!")
+    exit(1)
 
-print(f"Missing images: {missing}")
+# Look the deck up in the extraction manifest; an unchanged deck is only
+# stat'ed, never re-read
+manifest = ExtractionManifest(images_dir, EXTRACTOR)
+deck_hash = manifest.deck_hash(ppt_file)
+entries = manifest.entries(deck_hash)
+manifest.save()
 
-# Try to extract from PPT if they exist
-if missing:
-    print("\nAttempting to find missing images in PPT...")
-    with open("DOSSIER FINCA LA PRIORITA 2022.ppt", 'rb') as f:
-        content = f.read()
-    
-    # Look for additional JPEGs/PNGs that might be image_040 or image_041
-    # This is a quick check - the full extraction script should find them
+if entries is None:
+    print(f"{ppt_file} has not been extracted into {images_dir}/")
     print("Run extract_all_images.py for complete extraction")
+    exit(1)
 
+missing = manifest.missing(deck_hash)
+print(f"Found {len(entries) - len(missing)} existing images")
+print(f"Missing images: {[entry['name'] for entry in missing]}")
 
-
+if missing:
+    for entry in missing:
+        print(f"  {entry['name']}: {entry['type']} at offset {entry['offset']:,} "
+              f"({entry['length']:,} bytes) -> {entry['file']}")
+    print("\nRun extract_all_images.py to restore them")
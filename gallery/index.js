@@ -0,0 +1 @@
+window.GALLERY_FALLBACK = {"index":{"total":73,"page_size":24,"pages":["page-000.json","page-001.json","page-002.json","page-003.json"],"gallery_total":22,"categories":{"casa_principal":5,"casas_adyacentes":1,"confort_deporte":5,"dormitorios":5,"explotacion":4,"campo":2,"dossier":27,"ruralidays":24},"sections":{"casa-principal-grid":[{"src":"images_ruralidays/patio definitiva.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":361446,"category":"casa_principal"},{"src":"images_ruralidays/cocina definitiva.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":295165,"category":"casa_principal"},{"src":"images_ruralidays/comedor definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":265114,"category":"casa_principal"},{"src":"images_ruralidays/salon billar definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":309401,"category":"casa_principal"},{"src":"images_ruralidays/cuarto principal definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":254796,"category":"dormitorios"},{"src":"images_ruralidays/cuarto definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":269175,"category":"dormitorios"},{"src":"images_ruralidays/cuarto ninos definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":235605,"category":"dormitorios"},{"src":"images_ruralidays/bano principal definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":319079,"category":"dormitorios"},{"src":"images_ruralidays/terraza definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":366273,"category":"casa_principal"}],"casas-adyacentes-grid":[{"src":"images_ruralidays/casa adyacente definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":406960,"category":"casas_adyacentes"}],"confort-grid":[{"src":"images_ruralidays/jardin piscina definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":340148,"category":"confort_deporte"},{"src":"images_ruralidays/padel definitiva.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":260721,"category":"confort_deporte"},{"src":"images_ruralidays/tenis definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":264364,"category":"confort_deporte"},{"src":"images_ruralidays/pantano definitiva.jpeg","width":1024,"height":765,"aspect":1.3386,"bytes":134293,"category":"confort_deporte"}]}},"pages":{"page-000.json":[{"src":"images_ruralidays/patio definitiva.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":361446,"category":"casa_principal"},{"src":"images_ruralidays/cocina definitiva.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":295165,"category":"casa_principal"},{"src":"images_ruralidays/comedor definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":265114,"category":"casa_principal"},{"src":"images_ruralidays/salon billar definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":309401,"category":"casa_principal"},{"src":"images_ruralidays/terraza definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":366273,"category":"casa_principal"},{"src":"images_ruralidays/casa adyacente definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":406960,"category":"casas_adyacentes"},{"src":"images_ruralidays/jardin piscina definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":340148,"category":"confort_deporte"},{"src":"images_ruralidays/cuarto principal definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":254796,"category":"dormitorios"},{"src":"images_ruralidays/cuarto definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":269175,"category":"dormitorios"},{"src":"images_ruralidays/cuarto ninos definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":235605,"category":"dormitorios"},{"src":"images_ruralidays/cuarto cuadras definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":217262,"category":"dormitorios"},{"src":"images_ruralidays/bano principal definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":319079,"category":"dormitorios"},{"src":"images_ruralidays/jardin definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":523771,"category":"confort_deporte"},{"src":"images_ruralidays/padel definitiva.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":260721,"category":"confort_deporte"},{"src":"images_ruralidays/tenis definitivo.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":264364,"category":"confort_deporte"},{"src":"images_ruralidays/pantano definitiva.jpeg","width":1024,"height":765,"aspect":1.3386,"bytes":134293,"category":"confort_deporte"},{"src":"images_ruralidays/corcho definitivo.jpeg","width":800,"height":534,"aspect":1.4981,"bytes":159267,"category":"explotacion"},{"src":"images_ruralidays/foto eventos boda definitivo.jpeg","width":1024,"height":768,"aspect":1.3333,"bytes":144494,"category":"explotacion"},{"src":"images_ruralidays/foto vaca definitivo.jpeg","width":650,"height":380,"aspect":1.7105,"bytes":38955,"category":"explotacion"},{"src":"images_ruralidays/foto jabali definitivo.jpeg","width":768,"height":512,"aspect":1.5,"bytes":64093,"category":"explotacion"},{"src":"images_ruralidays/pasto definitivo.jpeg","width":1170,"height":1451,"aspect":0.8063,"bytes":540817,"category":"campo"},{"src":"images_ruralidays/campo definitiva.jpeg","width":1170,"height":1465,"aspect":0.7986,"bytes":300721,"category":"campo"},{"src":"images/655731919.jpg","width":1024,"height":685,"aspect":1.4949,"bytes":94792,"category":"dossier"},{"src":"images/655732041.jpg","width":1024,"height":685,"aspect":1.4949,"bytes":110613,"category":"dossier"}],"page-001.json":[{"src":"images/campo_02.jpg","width":414,"height":414,"aspect":1.0,"bytes":79011,"category":"dossier"},{"src":"images/campo_07.png","width":440,"height":230,"aspect":1.913,"bytes":238832,"category":"dossier"},{"src":"images/campo_09.png","width":430,"height":224,"aspect":1.9196,"bytes":159548,"category":"dossier"},{"src":"images/campo_10.png","width":482,"height":250,"aspect":1.928,"bytes":302186,"category":"dossier"},{"src":"images/campo_11.png","width":440,"height":246,"aspect":1.7886,"bytes":251557,"category":"dossier"},{"src":"images/campo_12.png","width":438,"height":246,"aspect":1.7805,"bytes":233408,"category":"dossier"},{"src":"images/campo_13.png","width":430,"height":246,"aspect":1.748,"bytes":244851,"category":"dossier"},{"src":"images/capilla.png","width":450,"height":338,"aspect":1.3314,"bytes":333239,"category":"dossier"},{"src":"images/cocina.jpg","width":925,"height":990,"aspect":0.9343,"bytes":235987,"category":"dossier"},{"src":"images/entrada.jpg","width":2200,"height":2475,"aspect":0.8889,"bytes":1210832,"category":"dossier"},{"src":"images/explotacion_06.png","width":450,"height":336,"aspect":1.3393,"bytes":296802,"category":"dossier"},{"src":"images/habitacion_01.png","width":455,"height":343,"aspect":1.3265,"bytes":286478,"category":"dossier"},{"src":"images/habitacion_02.png","width":455,"height":345,"aspect":1.3188,"bytes":258504,"category":"dossier"},{"src":"images/habitacion_03.png","width":455,"height":331,"aspect":1.3746,"bytes":223844,"category":"dossier"},{"src":"images/habitacion_04.png","width":455,"height":325,"aspect":1.4,"bytes":304559,"category":"dossier"},{"src":"images/habitacion_05.png","width":455,"height":341,"aspect":1.3343,"bytes":255307,"category":"dossier"},{"src":"images/habitacion_06.png","width":453,"height":350,"aspect":1.2943,"bytes":266653,"category":"dossier"},{"src":"images/jardin_piscina_04.jpg","width":1327,"height":977,"aspect":1.3582,"bytes":635992,"category":"dossier"},{"src":"images/jardin_piscina_06.jpg","width":1327,"height":981,"aspect":1.3527,"bytes":544374,"category":"dossier"},{"src":"images/padel.jpg","width":1237,"height":829,"aspect":1.4922,"bytes":283587,"category":"dossier"},{"src":"images/patio_andaluz_01.png","width":338,"height":335,"aspect":1.009,"bytes":206566,"category":"dossier"},{"src":"images/patio_andaluz_02.png","width":338,"height":348,"aspect":0.9713,"bytes":228866,"category":"dossier"},{"src":"images/piscina y jardin.jpg","width":640,"height":343,"aspect":1.8659,"bytes":39079,"category":"dossier"},{"src":"images/piscina.jpg","width":500,"height":375,"aspect":1.3333,"bytes":33680,"category":"dossier"}],"page-002.json":[{"src":"images/salon_01.jpg","width":925,"height":889,"aspect":1.0405,"bytes":216549,"category":"dossier"},{"src":"images_ruralidays/foto plano.png","width":1536,"height":1024,"aspect":1.5,"bytes":3105254,"category":"ruralidays"},{"src":"images_ruralidays/hero.jpg","width":4464,"height":2475,"aspect":1.8036,"bytes":2479418,"category":"ruralidays"},{"src":"images_ruralidays/rural days terraza.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":348213,"category":"ruralidays"},{"src":"images_ruralidays/rural padel.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":486646,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_006.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":369908,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_007.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":386129,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_009.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":308850,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_011.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":295704,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_013.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":368336,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_025.jpg","width":1200,"height":630,"aspect":1.9048,"bytes":228300,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_035.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":289809,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_046.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":342243,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_047.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":460503,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_063.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":428984,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_074.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":351252,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_122.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":389429,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_123.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":327161,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_128.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":226418,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_152.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":289831,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_166.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":125635,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_167.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":535176,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_173.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":221557,"category":"ruralidays"},{"src":"images_ruralidays/ruralidays_174.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":196934,"category":"ruralidays"}],"page-003.json":[{"src":"images_ruralidays/ruralidays_184.jpg","width":1600,"height":900,"aspect":1.7778,"bytes":207138,"category":"ruralidays"}]}};
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Gallery manifest for index.html
+Scans the image folders, reads each image's dimensions from its header
+(JPEG SOF, PNG IHDR, GIF screen descriptor) without decoding pixels, and
+writes gallery/index.json plus fixed-size pages the page loads one by one,
+and the same data as a script for index.html opened from disk
+"""
+import argparse
+import json
+import os
+import struct
+import time
+from pathlib import Path
+
+from image_carver import mapped
+from image_store import load_json
+from slideshow_renderer import list_images
+
+MANIFEST_DIR = "gallery"
+PAGE_SIZE = 24
+# fetch() is refused for a page opened from disk (file://) but a script
+# tag is not, so index.html falls back to this copy of the manifest
+FALLBACK_SCRIPT = "index.js"
+VARIANT_INDEX = Path("images_web") / "variants.json"
+DUPLICATES = Path("images_web") / "duplicates.json"
+
+# Curated gallery of images_ruralidays, in display order
+GALLERY = [
+    ('patio definitiva.jpg', 'casa_principal'),
+    ('cocina definitiva.jpg', 'casa_principal'),
+    ('comedor definitivo.jpg', 'casa_principal'),
+    ('salon billar definitivo.jpg', 'casa_principal'),
+    ('terraza definitivo.jpg', 'casa_principal'),
+    ('casa adyacente definitivo.jpg', 'casas_adyacentes'),
+    ('jardin piscina definitivo.jpg', 'confort_deporte'),
+    # Dormitorios y Baño (después de piscina)
+    ('cuarto principal definitivo.jpg', 'dormitorios'),
+    ('cuarto definitivo.jpg', 'dormitorios'),
+    ('cuarto ninos definitivo.jpg', 'dormitorios'),
+    ('cuarto cuadras definitivo.jpg', 'dormitorios'),
+    ('bano principal definitivo.jpg', 'dormitorios'),
+    ('jardin definitivo.jpg', 'confort_deporte'),
+    ('padel definitiva.jpg', 'confort_deporte'),
+    ('tenis definitivo.jpg', 'confort_deporte'),
+    ('pantano definitiva.jpeg', 'confort_deporte'),
+    ('corcho definitivo.jpeg', 'explotacion'),
+    ('foto eventos boda definitivo.jpeg', 'explotacion'),
+    ('foto vaca definitivo.jpeg', 'explotacion'),
+    ('foto jabali definitivo.jpeg', 'explotacion'),
+    ('pasto definitivo.jpeg', 'campo'),
+    ('campo definitiva.jpeg', 'campo'),
+]
+
+# Grids in the Espacios section: container id -> images, in order
+SECTIONS = {
+    'casa-principal-grid': [
+        'patio definitiva.jpg',
+        'cocina definitiva.jpg',
+        'comedor definitivo.jpg',
+        'salon billar definitivo.jpg',
+        'cuarto principal definitivo.jpg',
+        'cuarto definitivo.jpg',
+        'cuarto ninos definitivo.jpg',
+        'bano principal definitivo.jpg',
+        'terraza definitivo.jpg',
+    ],
+    'casas-adyacentes-grid': ['casa adyacente definitivo.jpg'],
+    'confort-grid': [
+        'jardin piscina definitivo.jpg',
+        'padel definitiva.jpg',
+        'tenis definitivo.jpg',
+        'pantano definitiva.jpeg',
+    ],
+}
+
+# Uncurated images are categorised by folder
+FOLDER_CATEGORIES = {'images_ruralidays': 'ruralidays', 'images': 'dossier'}
+
+# SOFn markers; C4 (DHT), C8 (JPG) and CC (DAC) share the range
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _exif_orientation(buf, start, end):
+    """Return the EXIF orientation tag from an APP1 segment body, or 1"""
+    if buf[start:start + 6] != b'Exif\x00\x00':
+        return 1
+    tiff = start + 6
+    order = bytes(buf[tiff:tiff + 2])
+    if order not in (b'II', b'MM'):
+        return 1
+    endian = '<' if order == b'II' else '>'
+    ifd = tiff + struct.unpack_from(endian + 'I', buf, tiff + 4)[0]
+    if ifd + 2 > end:
+        return 1
+    count = struct.unpack_from(endian + 'H', buf, ifd)[0]
+    for entry in range(ifd + 2, min(ifd + 2 + 12 * count, end - 11), 12):
+        tag, _, _, value = struct.unpack_from(endian + 'HHIH', buf, entry)
+        if tag == 0x0112:
+            return value
+    return 1
+
+
+def jpeg_size(buf):
+    """Return (width, height) of a JPEG as displayed, or None
+
+    Walks the marker segments up to the first SOF frame header; an EXIF
+    orientation of 5-8 swaps the two.
+    """
+    pos = 2
+    orientation = 1
+    end = len(buf)
+    while pos + 4 <= end:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack_from('>H', buf, pos + 2)[0]
+        if marker in _JPEG_SOF:
+            if pos + 9 > end:
+                return None
+            height, width = struct.unpack_from('>HH', buf, pos + 5)
+            return (height, width) if orientation >= 5 else (width, height)
+        if marker == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(buf, pos + 4, min(pos + 2 + length, end))
+        if marker in (0xD9, 0xDA):
+            return None
+        pos += 2 + length
+    return None
+
+
+def image_size(buf):
+    """Return (width, height) from an image header, or None"""
+    if buf[:3] == b'\xff\xd8\xff':
+        return jpeg_size(buf)
+    if buf[:8] == b'\x89PNG\r\n\x1a\n' and buf[12:16] == b'IHDR':
+        return struct.unpack_from('>II', buf, 16)
+    if buf[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack_from('<HH', buf, 6)
+    return None
+
+
+def scan_image(path):
+    """Return the manifest item for one image file, or None"""
+    size = os.path.getsize(path)
+    # Only the header pages of the mapping are ever touched
+    with mapped(path) as mm:
+        try:
+            dims = image_size(mm)
+        except (struct.error, IndexError):
+            dims = None
+    if not dims or not all(dims):
+        return None
+    width, height = dims
+    return {'src': path, 'width': width, 'height': height,
+            'aspect': round(width / height, 4), 'bytes': size}
+
+
+def build_manifest(folders=('images_ruralidays', 'images'), output_dir=MANIFEST_DIR,
+                   page_size=PAGE_SIZE):
+    """Scan folders and write the chunked gallery manifest
+
+    Curated gallery images come first in display order, then the rest
+    by folder and name; near-duplicates image_dedupe found are left out.
+    Returns the index object.
+    """
+    variants = load_json(VARIANT_INDEX)
+    dropped = load_json(DUPLICATES).get('dropped', {})
+    categories = {f"images_ruralidays/{name}": category for name, category in GALLERY}
+    order = {f"images_ruralidays/{name}": i for i, (name, _) in enumerate(GALLERY)}
+
+    items = {}
+    for folder in folders:
+        for path in list_images(folder):
+            if path in dropped:
+                continue
+            item = scan_image(path)
+            if item is None:
+                print(f"  ✗ No dimensions in {path}")
+                continue
+            item['category'] = categories.get(path, FOLDER_CATEGORIES.get(folder, folder))
+            if path in variants:
+                item['variants'] = [[width, (Path(VARIANT_INDEX.parent) / name).as_posix()]
+                                    for width, name in variants[path]['variants']]
+            items[path] = item
+
+    ordered = sorted(items.values(), key=lambda item: (order.get(item['src'], len(order)),
+                                                      item['src']))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pages = {}
+    for start in range(0, len(ordered), page_size):
+        name = f"page-{len(pages):03d}.json"
+        pages[name] = ordered[start:start + page_size]
+        _write_json(output_dir / name, pages[name])
+    for stale in output_dir.glob('page-*.json'):
+        if stale.name not in pages:
+            stale.unlink()
+
+    counts = {}
+    for item in ordered:
+        counts[item['category']] = counts.get(item['category'], 0) + 1
+    index = {
+        'total': len(ordered),
+        'page_size': page_size,
+        'pages': list(pages),
+        'gallery_total': sum(1 for item in ordered if item['src'] in order),
+        'categories': counts,
+        # Small and above the fold, so inlined rather than paged
+        'sections': {grid: [items[f"images_ruralidays/{name}"] for name in names
+                            if f"images_ruralidays/{name}" in items]
+                     for grid, names in SECTIONS.items()},
+    }
+    _write_json(output_dir / "index.json", index)
+    _write_text(output_dir / FALLBACK_SCRIPT,
+                f"window.GALLERY_FALLBACK = {_json({'index': index, 'pages': pages})};\n")
+    return index
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _write_json(path, data):
+    _write_text(path, _json(data))
+
+
+def _write_text(path, text):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write the gallery manifest for index.html')
+    parser.add_argument('folders', nargs='*', default=['images_ruralidays', 'images'],
+                        help='Image folders (default: images_ruralidays images)')
+    parser.add_argument('--output', '-o', default=MANIFEST_DIR, help='Manifest folder')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help='Images per page')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_manifest(args.folders, args.output, args.page_size)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.output}/index.json: {index['total']} images in {len(index['pages'])} pages "
+          f"({elapsed * 1000 / max(index['total'], 1):.2f} ms per image)")
+    for category, count in sorted(index['categories'].items()):
+        print(f"  {category}: {count}")
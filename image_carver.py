@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Single-pass image carver for binary decks
+Memory-maps the file and finds every image signature in one ordered pass
+over fast per-signature literal searches
+"""
+import bisect
+import contextlib
+import heapq
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# (image type, literal prefix) for every signature; a GIF header must go
+# on with 7a or 9a, and a BMP header needs the four reserved bytes at
+# offset 6 to be zero
+SIGNATURES = [
+    ('jpg', b'\xff\xd8\xff'),
+    ('png', b'\x89PNG\r\n\x1a\n'),
+    ('gif', b'GIF8'),
+    ('tiff', b'II*\x00'),
+    ('tiff', b'MM\x00*'),
+    ('bmp', b'BM'),
+]
+_GIF_VERSIONS = (b'7a', b'9a')
+_BMP_RESERVED = b'\x00\x00\x00\x00'
+
+# Longest signature match (BMP header) minus one
+SIGNATURE_OVERLAP = 9
+
+MAX_IMAGE_SIZE = 50000000  # 50MB
+
+# First marker after entropy-coded data (not FF00 stuffing or RSTn)
+_JPEG_MARKER_RE = re.compile(rb'\xff+[^\x00\xd0-\xd7\xff]')
+
+
+def find_signatures(buf, start=0, end=None):
+    """Yield (type, offset) for every signature lying entirely inside
+    buf[start:end], in file order
+
+    Each signature has its own bytes.find cursor, which runs at memchr
+    speed, and a small heap merges the cursors; the bytes in between are
+    never looked at from Python.
+    """
+    if end is None:
+        end = len(buf)
+    heap = []
+    for index, (_, prefix) in enumerate(SIGNATURES):
+        pos = buf.find(prefix, start, end)
+        if pos >= 0:
+            heap.append((pos, index))
+    heapq.heapify(heap)
+    while heap:
+        pos, index = heap[0]
+        img_type, prefix = SIGNATURES[index]
+        next_pos = buf.find(prefix, pos + 1, end)
+        if next_pos >= 0:
+            heapq.heapreplace(heap, (next_pos, index))
+        else:
+            heapq.heappop(heap)
+        if img_type == 'gif' and (pos + 6 > end or buf[pos + 4:pos + 6] not in _GIF_VERSIONS):
+            continue
+        if img_type == 'bmp' and (pos + SIGNATURE_OVERLAP >= end or
+                                  buf[pos + 6:pos + 10] != _BMP_RESERVED):
+            continue
+        yield img_type, pos
+
+
+def jpeg_end(buf, start):
+    """Return the end offset of the JPEG at start, or None
+
+    Walks the marker segments by their length fields, so EOI bytes inside
+    APPn payloads (EXIF thumbnails) are skipped, and jumps over entropy-coded
+    scan data to the next real marker.
+    """
+    size = len(buf)
+    pos = start + 2
+    while pos + 2 <= size:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        if marker == 0xD9:
+            return pos + 2
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # Standalone markers carry no length
+            pos += 2
+            continue
+        if pos + 4 > size:
+            return None
+        seg_len = struct.unpack_from('>H', buf, pos + 2)[0]
+        if seg_len < 2:
+            return None
+        pos += 2 + seg_len
+        if marker == 0xDA:
+            # Entropy-coded data: skip stuffed FF00 bytes and RSTn markers
+            match = _JPEG_MARKER_RE.search(buf, pos)
+            if match is None:
+                return None
+            pos = match.end() - 2
+    return None
+
+
+def png_end(buf, start):
+    """Return the end offset of the PNG at start, or None
+
+    Jumps chunk by chunk using the length fields and checks each CRC.
+    A damaged PNG ends at its last valid chunk, provided the IHDR and at
+    least one IDAT chunk were intact.
+    """
+    size = len(buf)
+    pos = start + 8
+    last_good = None
+    seen_idat = False
+    with memoryview(buf) as view:
+        while pos + 12 <= size:
+            length, chunk_type = struct.unpack_from('>I4s', buf, pos)
+            data_end = pos + 8 + length
+            if length > MAX_IMAGE_SIZE or data_end + 4 > size or not chunk_type.isalpha():
+                break
+            if pos == start + 8 and chunk_type != b'IHDR':
+                return None
+            crc = struct.unpack_from('>I', buf, data_end)[0]
+            if zlib.crc32(view[pos + 8:data_end], zlib.crc32(chunk_type)) != crc:
+                break
+            pos = data_end + 4
+            if chunk_type == b'IEND':
+                return pos
+            if chunk_type == b'IDAT':
+                seen_idat = True
+            last_good = pos
+    if seen_idat:
+        return last_good
+    return None
+
+
+def gif_end(buf, start):
+    """Return the end offset of the GIF at start (trailer included)"""
+    trailer = buf.find(b'\x00;', start)
+    if trailer == -1:
+        return min(start + 10000000, len(buf))  # Max 10MB
+    return trailer + 2
+
+
+# Byte size of each TIFF field type
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4,
+                    10: 8, 11: 4, 12: 8, 13: 4}
+_TIFF_TYPE_FORMATS = {3: 'H', 4: 'I', 13: 'I'}
+
+# (offsets tag, byte counts tag) pairs that locate the image data
+_TIFF_DATA_TAGS = [(273, 279), (324, 325), (513, 514)]
+
+
+def tiff_end(buf, start):
+    """Return the end offset of the TIFF at start, or None
+
+    Follows the IFD chain and takes the furthest byte referenced by any
+    IFD, out-of-line tag value, strip, tile or JPEG thumbnail. Returns None
+    for headers without image data, such as the TIFF block inside EXIF,
+    and for truncated or malformed ones.
+    """
+    if start + 8 > len(buf):
+        return None
+    try:
+        return _walk_tiff(buf, start)
+    except struct.error:
+        # An IFD entry pointing past the end of the buffer
+        return None
+
+
+def _walk_tiff(buf, start):
+    size = len(buf)
+    order = '<' if buf[start:start + 2] == b'II' else '>'
+    limit = min(size - start, MAX_IMAGE_SIZE)
+    extent = 8
+    has_data = False
+    seen = set()
+
+    ifd = struct.unpack_from(order + 'I', buf, start + 4)[0]
+    while ifd:
+        if ifd in seen or ifd + 2 > limit or len(seen) > 1000:
+            return None
+        seen.add(ifd)
+        count = struct.unpack_from(order + 'H', buf, start + ifd)[0]
+        ifd_end = ifd + 2 + 12 * count + 4
+        if ifd_end > limit:
+            return None
+        extent = max(extent, ifd_end)
+
+        values = {}
+        for entry in range(start + ifd + 2, start + ifd + 2 + 12 * count, 12):
+            tag, field_type, n = struct.unpack_from(order + 'HHI', buf, entry)
+            value_size = _TIFF_TYPE_SIZES.get(field_type, 1) * n
+            value_pos = entry + 8
+            if value_size > 4:
+                value_offset = struct.unpack_from(order + 'I', buf, value_pos)[0]
+                if value_offset + value_size > limit:
+                    return None
+                extent = max(extent, value_offset + value_size)
+                value_pos = start + value_offset
+            fmt = _TIFF_TYPE_FORMATS.get(field_type)
+            if fmt is not None and any(tag in pair for pair in _TIFF_DATA_TAGS):
+                values[tag] = struct.unpack_from(f'{order}{n}{fmt}', buf, value_pos)
+
+        for offsets_tag, counts_tag in _TIFF_DATA_TAGS:
+            for offset, length in zip(values.get(offsets_tag, ()), values.get(counts_tag, ())):
+                if offset + length > limit:
+                    return None
+                extent = max(extent, offset + length)
+                has_data = True
+
+        ifd = struct.unpack_from(order + 'I', buf, start + ifd_end - 4)[0]
+
+    if not has_data:
+        return None
+    return start + extent
+
+
+def bmp_end(buf, start):
+    """Return the end offset of the BMP at start, or None"""
+    if start + 6 > len(buf):
+        return None
+    bmp_size = struct.unpack_from('<I', buf, start + 2)[0]
+    if not 100 < bmp_size < MAX_IMAGE_SIZE:
+        return None
+    end = start + bmp_size
+    if end >= len(buf):
+        return None
+    return end
+
+
+END_FINDERS = {
+    'jpg': jpeg_end,
+    'png': png_end,
+    'gif': gif_end,
+    'tiff': tiff_end,
+    'bmp': bmp_end,
+}
+
+
+def _is_valid(img_type, buf, start, end):
+    """Apply the per-type size and header checks of the original methods"""
+    length = end - start
+    if img_type == 'jpg':
+        # Check if it's a valid JPEG by looking for JFIF or EXIF markers
+        head = buf[start:start + 100]
+        return length > 1000 and (b'JFIF' in head or b'Exif' in head or
+                                  b'\xff\xe0' in head[:20] or b'\xff\xe1' in head[:20])
+    if img_type == 'tiff':
+        return length > 1000
+    return length > 100
+
+
+def iter_images(buf):
+    """Yield (type, start, end) for every image found in buf in one pass
+
+    Each type keeps its own resume cursor, so an image of one type may sit
+    inside another (e.g. the TIFF header of an EXIF block inside a JPEG),
+    exactly as with the separate per-type scans.
+    """
+    resume = dict.fromkeys(END_FINDERS, 0)
+    for img_type, start in find_signatures(buf):
+        if start < resume[img_type]:
+            continue
+        end = END_FINDERS[img_type](buf, start)
+        if end is None:
+            continue
+        resume[img_type] = end
+        if _is_valid(img_type, buf, start, end):
+            yield img_type, start, end
+
+
+def scan_window(buf, start, stop):
+    """Return (type, start, end, valid) for every signature starting in [start, stop)
+
+    No resume cursors are applied, so adjacent windows can be scanned
+    independently and merged with resume_filter. The match window overlaps
+    the next one by SIGNATURE_OVERLAP bytes so that signatures straddling
+    the boundary are found, but only hits starting before stop are kept,
+    so none is reported twice. Image ends may lie past stop.
+    """
+    hits = []
+    endpos = min(stop + SIGNATURE_OVERLAP, len(buf))
+    for img_type, hit_start in find_signatures(buf, start, endpos):
+        if hit_start >= stop:
+            break
+        end = END_FINDERS[img_type](buf, hit_start)
+        if end is not None:
+            hits.append((img_type, hit_start, end, _is_valid(img_type, buf, hit_start, end)))
+    return hits
+
+
+def resume_filter(hits):
+    """Apply per-type resume cursors to scan_window hits in file order
+
+    Yields the same (type, start, end) records as iter_images.
+    """
+    resume = dict.fromkeys(END_FINDERS, 0)
+    for img_type, start, end, valid in hits:
+        if start < resume[img_type]:
+            continue
+        resume[img_type] = end
+        if valid:
+            yield img_type, start, end
+
+
+class _Fenwick:
+    """Binary indexed tree over compressed offsets (prefix sum or max)"""
+
+    def __init__(self, size, combine):
+        self.tree = [0] * (size + 1)
+        self.combine = combine
+
+    def update(self, index, value):
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] = self.combine(self.tree[index], value)
+            index += index & -index
+
+    def query(self, index):
+        """Combine the values at positions 0..index-1"""
+        result = 0
+        while index > 0:
+            result = self.combine(result, self.tree[index])
+            index -= index & -index
+        return result
+
+
+def dedupe_images(images, tolerance=100, report_nested=False):
+    """Drop carved records that overlap or sit near an already kept one
+
+    Records are taken in the given (priority) order. A record is a duplicate
+    if a kept record starts less than tolerance bytes away, or if its start
+    falls inside a kept record. Both checks are O(log n) lookups in Fenwick
+    trees over the sorted start offsets, so the whole pass is O(n log n).
+
+    With report_nested, also returns (inner, outer) pairs for every carved
+    range that lies entirely inside another, e.g. a thumbnail inside its
+    parent JPEG.
+    """
+    starts = sorted({pos for _, pos, _ in images})
+    kept_count = _Fenwick(len(starts), lambda a, b: a + b)
+    kept_end = _Fenwick(len(starts), max)
+    unique_images = []
+
+    for record in images:
+        _, pos, data = record
+        lo = bisect.bisect_right(starts, pos - tolerance)
+        hi = bisect.bisect_left(starts, pos + tolerance)
+        if kept_count.query(hi) - kept_count.query(lo):
+            continue
+        index = bisect.bisect_left(starts, pos)
+        # Any kept record starting at or before pos that reaches past it
+        if kept_end.query(index + 1) > pos:
+            continue
+        kept_count.update(index, 1)
+        kept_end.update(index, pos + len(data))
+        unique_images.append(record)
+
+    if not report_nested:
+        return unique_images
+    return unique_images, find_nested(images)
+
+
+def find_nested(images):
+    """Return (inner, outer) pairs for records contained in another one
+
+    Sweeps the ranges by start offset (longest first on ties) and compares
+    each end with the furthest end seen so far.
+    """
+    nested = []
+    outer = None
+    outer_end = -1
+    for record in sorted(images, key=lambda x: (x[1], -len(x[2]))):
+        end = record[1] + len(record[2])
+        if outer is not None and end <= outer_end:
+            nested.append((record, outer))
+        else:
+            outer, outer_end = record, end
+    return nested
+
+
+@contextlib.contextmanager
+def mapped(path):
+    """Memory-map path read-only for the duration of the block
+
+    Closing is best effort: while memoryview slices of the map are still
+    alive it stays open and is released together with the last of them.
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b''
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mm
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass
+
+
+def carve_images(path):
+    """Carve all images from path
+
+    Returns (images, stats): images is a list of (type, offset, data)
+    records in file order, where data is a zero-copy memoryview of the
+    mapped file, and stats holds the scan throughput.
+    """
+    images = []
+    started = time.perf_counter()
+    with mapped(path) as mm:
+        file_size = len(mm)
+        view = memoryview(mm)
+        for img_type, start, end in iter_images(mm):
+            images.append((img_type, start, view[start:end]))
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        'bytes': file_size,
+        'seconds': elapsed,
+        'mb_per_s': file_size / 1e6 / elapsed if elapsed else 0.0,
+    }
+    return images, stats
+
+
+def _scan_file_window(args):
+    """Process pool worker: scan one window of a mapped file"""
+    path, start, stop = args
+    with mapped(path) as mm:
+        return scan_window(mm, start, stop)
+
+
+def carve_images_sharded(path, workers=None, window_size=64 * 1024 * 1024):
+    """Carve path like carve_images, scanning byte windows on separate cores
+
+    Each worker maps the file and scans one window; the hits are merged
+    in file order with resume_filter, so the result is identical to a
+    single-process scan.
+    """
+    started = time.perf_counter()
+    file_size = os.path.getsize(path)
+    windows = [(path, start, min(start + window_size, file_size))
+               for start in range(0, file_size, window_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hits = [hit for window_hits in pool.map(_scan_file_window, windows)
+                for hit in window_hits]
+
+    images = []
+    with mapped(path) as mm:
+        view = memoryview(mm)
+        for img_type, start, end in resume_filter(hits):
+            images.append((img_type, start, view[start:end]))
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        'bytes': file_size,
+        'seconds': elapsed,
+        'mb_per_s': file_size / 1e6 / elapsed if elapsed else 0.0,
+    }
+    return images, stats
+
+
+def iter_carve_stream(stream, sink=None, chunk_size=1024 * 1024,
+                      lookahead=MAX_IMAGE_SIZE):
+    """Carve images from a binary stream read in fixed-size chunks
+
+    Yields (type, offset, length) records as soon as each image is decided,
+    after passing its bytes to sink(type, offset, data) if given. data is a
+    temporary memoryview that must not be kept after sink returns.
+
+    A signature is decided once lookahead bytes past it have been read (or
+    the stream ended), so partial signatures and images are carried over
+    chunk boundaries. The buffer never holds much more than lookahead plus
+    two chunks, whatever the stream size; images longer than lookahead are
+    not found. Works on pipes and stdin as well as regular files.
+    """
+    buf = bytearray()
+    base = 0  # Stream offset of buf[0]
+    scan = 0  # Next buffer position to search for signatures
+    resume = dict.fromkeys(END_FINDERS, 0)
+    eof = False
+
+    while not eof:
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buf += chunk
+        else:
+            eof = True
+
+        limit = len(buf) if eof else len(buf) - lookahead
+        if scan < limit:
+            for img_type, start in find_signatures(buf, scan, min(limit + SIGNATURE_OVERLAP, len(buf))):
+                if start >= limit:
+                    break
+                scan = start + 1
+                if base + start < resume[img_type]:
+                    continue
+                end = END_FINDERS[img_type](buf, start)
+                if end is None:
+                    continue
+                resume[img_type] = base + end
+                if not _is_valid(img_type, buf, start, end):
+                    continue
+                if sink is not None:
+                    with memoryview(buf) as view, view[start:end] as data:
+                        sink(img_type, base + start, data)
+                yield img_type, base + start, end - start
+            scan = max(scan, limit)
+
+        # Drop decided bytes; only when at least half the buffer can go, so
+        # trimming costs O(1) per byte read
+        if scan >= max(chunk_size, len(buf) // 2):
+            del buf[:scan]
+            base += scan
+            scan = 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <file|->")
+        sys.exit(1)
+
+    if sys.argv[1] == '-':
+        # Streaming mode for pipes: records are printed as they are found
+        count = 0
+        for img_type, pos, length in iter_carve_stream(sys.stdin.buffer):
+            print(f"  {img_type:5s} at offset {pos:,} ({length:,} bytes)")
+            count += 1
+        print(f"\n{count} images")
+        sys.exit(0)
+
+    images, stats = carve_images(sys.argv[1])
+    for img_type, pos, data in images:
+        print(f"  {img_type:5s} at offset {pos:,} ({len(data):,} bytes)")
+    print(f"\n{len(images)} images, scanned {stats['bytes']:,} bytes "
+          f"in {stats['seconds']:.2f}s ({stats['mb_per_s']:.1f} MB/s)")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate images across the image folders
+Every image gets a 64-bit dHash and pHash, computed in NumPy batches and
+cached by content hash; a multi-index over the pHashes finds the images
+within a few bits of each other without comparing every pair. In each
+group of near-duplicates the highest-resolution copy is kept, and the
+others are listed in images_web/duplicates.json for later stages to skip
+"""
+import argparse
+import json
+import os
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from image_store import load_json, save_merged
+from image_variants import VARIANTS_DIR, VariantIndex
+from slideshow_renderer import list_images
+
+HASH_INDEX = "phashes.json"
+DUPLICATES_FILE = "duplicates.json"
+# pHash: DCT of a 32x32 grayscale image, low 8x8 frequencies
+PHASH_SIZE = 32
+PHASH_LOW = 8
+# Bits two copies of one photo may differ by; a pHash match must be
+# confirmed by the dHash
+PHASH_THRESHOLD = 10
+DHASH_THRESHOLD = 12
+HASH_BATCH = 256
+# 16-bit chunks: a 10-bit search probes each table within 2 bits
+INDEX_CHUNKS = 4
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix: D @ x is the DCT of the columns of x"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _sample_gray(src_path):
+    """Decode an image small and grayscale; returns (width, height,
+    32x32 pixels for the pHash, 9x8 pixels for the dHash)
+    """
+    with Image.open(src_path) as img:
+        width, height = img.size
+        img.draft('L', (PHASH_SIZE * 2, PHASH_SIZE * 2))
+        img = ImageOps.exif_transpose(img).convert('L')
+        # Dimensions as displayed: swapped if the EXIF orientation rotated it
+        if (img.width < img.height) != (width < height):
+            width, height = height, width
+        return (width, height,
+                np.asarray(img.resize((PHASH_SIZE, PHASH_SIZE), Image.BILINEAR)),
+                np.asarray(img.resize((9, 8), Image.BILINEAR)))
+
+
+def _pack(bits):
+    """Pack an (N, 64) boolean array into N Python ints"""
+    return [int(v) for v in np.packbits(bits, axis=1).view('>u8').ravel()]
+
+
+def batch_hashes(phash_pixels, dhash_pixels):
+    """Return (pHashes, dHashes) as ints for stacked (N, 32, 32) and
+    (N, 8, 9) grayscale arrays
+
+    pHash: bit set where a low-frequency DCT coefficient is above the
+    median of the 63 non-DC ones. dHash: bit set where a pixel is
+    brighter than its left neighbour.
+    """
+    pixels = phash_pixels.astype(np.float32)
+    # Two matrix products transform the whole batch at once
+    coeffs = (_DCT @ pixels @ _DCT.T)[:, :PHASH_LOW, :PHASH_LOW].reshape(len(pixels), -1)
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    small = dhash_pixels.astype(np.int16)
+    dbits = (small[:, :, 1:] > small[:, :, :-1]).reshape(len(small), -1)
+    return _pack(coeffs > median), _pack(dbits)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class MultiIndex:
+    """Multi-index hashing over 64-bit hashes with Hamming distance
+
+    Each hash is split into CHUNKS chunks with one lookup table each. Two
+    hashes within r bits of each other differ by at most r // CHUNKS bits
+    in at least one chunk, so a search only probes the chunk values that
+    close to the query's and checks the few candidates it finds, instead
+    of comparing against every hash.
+    """
+
+    def __init__(self, chunks=INDEX_CHUNKS, bits=64):
+        self.width = bits // chunks
+        self.mask = (1 << self.width) - 1
+        self.tables = [{} for _ in range(chunks)]
+        self.entries = []
+        self.comparisons = 0
+
+    def _keys(self, value):
+        return [(value >> (i * self.width)) & self.mask for i in range(len(self.tables))]
+
+    def add(self, value, item):
+        for table, key in zip(self.tables, self._keys(value)):
+            table.setdefault(key, []).append(len(self.entries))
+        self.entries.append((value, item))
+
+    def search(self, value, radius):
+        """Return [(distance, item)] for every item within radius"""
+        flips = _flip_masks(self.width, radius // len(self.tables))
+        candidates = set()
+        for table, key in zip(self.tables, self._keys(value)):
+            for flip in flips:
+                candidates.update(table.get(key ^ flip, ()))
+        found = []
+        for idx in candidates:
+            other, item = self.entries[idx]
+            distance = hamming(value, other)
+            if distance <= radius:
+                found.append((distance, item))
+        self.comparisons += len(candidates)
+        return found
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(width, radius):
+    """Every width-bit mask with at most radius bits set"""
+    return [sum(1 << bit for bit in bits)
+            for count in range(radius + 1)
+            for bits in combinations(range(width), count)]
+
+
+def compute_hashes(image_paths, out_dir=VARIANTS_DIR):
+    """Return {source path: {'phash', 'dhash', 'width', 'height'}}
+
+    Cached by source content hash in phashes.json (hashes as hex); new
+    images are decoded small one by one and hashed in batches.
+    """
+    index = VariantIndex(out_dir)
+    cache_path = index.root / HASH_INDEX
+    cache = load_json(cache_path)
+    hashes = {src_path: index.source_hash(src_path) for src_path in image_paths}
+    pending = list({src_hash: src_path for src_path, src_hash in hashes.items()
+                    if src_hash not in cache}.items())
+
+    for start in range(0, len(pending), HASH_BATCH):
+        batch = []
+        for src_hash, src_path in pending[start:start + HASH_BATCH]:
+            try:
+                batch.append((src_hash, _sample_gray(src_path)))
+            except Exception as e:
+                print(f"  ✗ Error reading {src_path}: {e}")
+        if not batch:
+            continue
+        phashes, dhashes = batch_hashes(np.stack([s[2] for _, s in batch]),
+                                        np.stack([s[3] for _, s in batch]))
+        for (src_hash, (width, height, _, _)), phash, dhash in zip(batch, phashes, dhashes):
+            cache[src_hash] = {'phash': f"{phash:016x}", 'dhash': f"{dhash:016x}",
+                               'width': width, 'height': height}
+    if pending:
+        cache = save_merged(cache_path, cache, [src_hash for src_hash, _ in pending])
+
+    return {src_path: {'phash': int(cache[src_hash]['phash'], 16),
+                       'dhash': int(cache[src_hash]['dhash'], 16),
+                       'width': cache[src_hash]['width'],
+                       'height': cache[src_hash]['height']}
+            for src_path, src_hash in hashes.items() if src_hash in cache}
+
+
+def find_duplicates(hashes, phash_threshold=PHASH_THRESHOLD, dhash_threshold=DHASH_THRESHOLD):
+    """Group near-duplicate images; returns (groups, index)
+
+    Each group lists its paths best first: most pixels, then largest
+    file, then path. Groups are transitive (a ~ b and b ~ c puts a, b
+    and c together) and ordered by their best path.
+    """
+    index = MultiIndex()
+    for path, info in hashes.items():
+        index.add(info['phash'], path)
+
+    parent = {path: path for path in hashes}
+
+    def root(path):
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    for path, info in hashes.items():
+        for _, other in index.search(info['phash'], phash_threshold):
+            if other != path and hamming(info['dhash'], hashes[other]['dhash']) <= dhash_threshold:
+                parent[root(other)] = root(path)
+
+    groups = {}
+    for path in hashes:
+        groups.setdefault(root(path), []).append(path)
+
+    def rank(path):
+        info = hashes[path]
+        return (-info['width'] * info['height'], -os.path.getsize(path), path)
+
+    groups = [sorted(members, key=rank) for members in groups.values() if len(members) > 1]
+    return sorted(groups, key=lambda members: members[0]), index
+
+
+def write_report(groups, protected=(), out_dir=VARIANTS_DIR):
+    """Write duplicates.json and return its 'dropped' map
+
+    dropped maps every image but the best of its group to the one kept;
+    protected paths are never dropped.
+    """
+    protected = set(protected)
+    dropped = {path: members[0] for members in groups for path in members[1:]
+               if path not in protected}
+    path = Path(out_dir) / DUPLICATES_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'groups': groups, 'dropped': dropped}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return dropped
+
+
+def load_dropped(out_dir=VARIANTS_DIR):
+    """Return {dropped path: kept path} from the last report, or {}"""
+    return load_json(Path(out_dir) / DUPLICATES_FILE).get('dropped', {})
+
+
+def protected_images():
+    """Images that stay even when a better copy exists: the curated
+    gallery and the images the dossier slides use
+    """
+    from gallery_manifest import GALLERY
+    return [f"images_ruralidays/{name}" for name, _ in GALLERY] + list_images("images")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find near-duplicate images and keep the largest copy')
+    parser.add_argument('dirs', nargs='*', default=['images_ruralidays', 'images'],
+                        help='Image folders (default: images_ruralidays images)')
+    parser.add_argument('--output', '-o', default=VARIANTS_DIR, help='Folder for the hash cache and report')
+    parser.add_argument('--threshold', type=int, default=PHASH_THRESHOLD,
+                        help='Maximum pHash distance in bits')
+
+    args = parser.parse_args()
+
+    sources = [path for folder in args.dirs for path in list_images(folder)]
+    hashes = compute_hashes(sources, args.output)
+    groups, index = find_duplicates(hashes, args.threshold)
+    dropped = write_report(groups, protected_images(), args.output)
+
+    for members in groups:
+        best = hashes[members[0]]
+        print(f"✓ {members[0]} ({best['width']}x{best['height']})")
+        for path in members[1:]:
+            info = hashes[path]
+            state = "drop" if path in dropped else "keep"
+            print(f"    {state} {path} ({info['width']}x{info['height']}, "
+                  f"{hamming(best['phash'], info['phash'])} bits)")
+    print(f"\n{len(groups)} groups, {len(dropped)} images to skip; "
+          f"{index.comparisons} hash comparisons instead of {len(hashes) ** 2}")
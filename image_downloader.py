@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Concurrent image downloader
+A thread pool shares one pooled requests session, so connections are
+reused across images; a per-host limit keeps a gallery from opening too
+many connections to one server. Results come back in job order. With a
+DownloadCache, re-runs only revalidate what is already on disk and
+interrupted transfers are resumed
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from image_store import load_json, save_merged
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+WORKERS = 16
+PER_HOST = 8
+TIMEOUT = 30
+CACHE_INDEX = "downloads.json"
+CHUNK_SIZE = 256 * 1024
+
+
+def make_session(pool_size=WORKERS):
+    """Return a session whose connection pool fits pool_size threads
+
+    Connection errors and 429/5xx answers are retried with backoff.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=('GET', 'HEAD'))
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class HostLimiter:
+    """At most limit requests in flight to any one host"""
+
+    def __init__(self, limit=PER_HOST):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = threading.BoundedSemaphore(self.limit)
+            return self.hosts[host]
+
+
+class DownloadCache:
+    """Persistent index of downloaded URLs
+
+    Each URL maps to its local path (relative to the index), the ETag and
+    Last-Modified validators the server sent, and the content hash and
+    size of the complete file; hash is None while a transfer is unfinished.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.root = self.path.parent
+        self.entries = load_json(self.path)
+        self.lock = threading.Lock()
+        self.dirty = set()
+
+    def get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            return dict(entry) if entry else None
+
+    def local_path(self, url):
+        """Return the path url was saved to before, or None"""
+        entry = self.get(url)
+        return self.root / entry['path'] if entry else None
+
+    def owns(self, url, save_path):
+        """True if save_path is where url was downloaded before"""
+        entry = self.get(url)
+        return bool(entry) and entry['path'] == os.path.relpath(save_path, self.root)
+
+    def paths(self):
+        with self.lock:
+            return {entry['path'] for entry in self.entries.values()}
+
+    def update(self, url, save_path, **fields):
+        with self.lock:
+            entry = self.entries.setdefault(url, {})
+            entry['path'] = os.path.relpath(save_path, self.root)
+            entry.update(fields)
+            self.dirty.add(url)
+
+    def save(self):
+        with self.lock:
+            if self.dirty:
+                self.entries = save_merged(self.path, self.entries, sorted(self.dirty))
+                self.dirty.clear()
+
+
+def _part_path(save_path):
+    save_path = Path(save_path)
+    return save_path.with_name(f".{save_path.name}.part")
+
+
+def _expected_size(response, offset):
+    """Return the complete size the response promises, or None"""
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    # A compressed body is decoded on the way, so its length says nothing
+    if length and length.isdigit() and not response.headers.get('Content-Encoding'):
+        return offset + int(length)
+    return None
+
+
+def _stream_to(response, part_path, offset):
+    """Append the body of response to part_path, which holds its first
+    offset bytes; returns (content hash, size)
+
+    Only one chunk is in memory at a time; the hash of the bytes already
+    there is computed from the file first, so a resumed file gets the
+    same hash as a fresh one.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    size = 0
+    with open(part_path, 'r+b' if offset else 'wb') as f:
+        while size < offset:
+            chunk = f.read(min(CHUNK_SIZE, offset - size))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+        f.seek(size)
+        f.truncate()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            hasher.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    return hasher.hexdigest(), size
+
+
+def download_image(session, url, save_path, timeout=TIMEOUT, cache=None):
+    """Download url to save_path with session; returns (status, byte count)
+
+    status is 'downloaded', 'resumed' or 'not modified'. The body is
+    streamed in chunks to a .part file, hashed on the way, and renamed
+    into place only once its size matches what the server announced, so
+    save_path never holds a truncated image. With a cache, a file already
+    on disk is only revalidated (If-None-Match / If-Modified-Since), a
+    .part file left by an interrupted transfer continues with a Range
+    request as long as the server's validator still matches (If-Range),
+    and an existing file the cache has no record of is never overwritten.
+    """
+    save_path = Path(save_path)
+    part_path = _part_path(save_path)
+    if cache and save_path.exists() and not cache.owns(url, save_path):
+        # Never replace a file the index does not know came from url
+        raise OSError(f"{save_path} exists and is not a download of {url}")
+    entry = cache.get(url) if cache else None
+    validator = entry and (entry.get('etag') or entry.get('last_modified'))
+    headers = {}
+    offset = 0
+    if entry and entry.get('hash') and save_path.exists() \
+            and save_path.stat().st_size == entry.get('bytes'):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    elif validator and part_path.exists():
+        offset = part_path.stat().st_size
+        headers['Range'] = f"bytes={offset}-"
+        headers['If-Range'] = validator
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return 'not modified', entry['bytes']
+        if response.status_code == 416:
+            # The part file is not a prefix of the current resource
+            part_path.unlink()
+            return download_image(session, url, save_path, timeout, cache)
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0
+        elif not response.headers.get('Content-Range', '').startswith(f"bytes {offset}-"):
+            raise requests.RequestException(f"Unexpected Content-Range for {url}")
+        if cache:
+            # Recorded before the body so an interrupted transfer can resume
+            cache.update(url, save_path, etag=response.headers.get('ETag'),
+                         last_modified=response.headers.get('Last-Modified'), hash=None, bytes=None)
+        expected = _expected_size(response, offset)
+        digest, size = _stream_to(response, part_path, offset)
+    if expected is not None and size != expected:
+        # The .part file stays behind for the next run to resume
+        raise requests.RequestException(f"Incomplete download: {size} of {expected} bytes")
+    os.replace(part_path, save_path)
+
+    if cache:
+        cache.update(url, save_path, hash=digest, bytes=size)
+    return ('resumed' if offset else 'downloaded'), size
+
+
+def download_all(jobs, workers=WORKERS, per_host=PER_HOST, session=None, timeout=TIMEOUT,
+                 cache=None):
+    """Download every (url, save_path) job concurrently
+
+    Returns one dict (url, path, ok, status, bytes, error) per job, in job
+    order; progress is printed in the same order as results complete. The
+    cache, if given, is saved at the end even when the run is interrupted.
+    """
+    session = session or make_session(workers)
+    limiter = HostLimiter(per_host)
+
+    def fetch(url, save_path):
+        try:
+            with limiter(url):
+                status, size = download_image(session, url, save_path, timeout, cache)
+            return {'url': url, 'path': str(save_path), 'ok': True, 'status': status,
+                    'bytes': size, 'error': None}
+        except (requests.RequestException, OSError) as e:
+            return {'url': url, 'path': str(save_path), 'ok': False, 'status': 'failed',
+                    'bytes': 0, 'error': str(e)}
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch, url, save_path) for url, save_path in jobs]
+            for idx, future in enumerate(futures, 1):
+                result = future.result()
+                results.append(result)
+                print(f"[{idx}/{len(futures)}] {result['url'][:80]}")
+                if result['status'] == 'not modified':
+                    print(f"  ✓ Not modified: {result['path']}")
+                elif result['ok']:
+                    print(f"  ✓ Saved to {result['path']}" + (" (resumed)" if result['status'] == 'resumed' else ""))
+                else:
+                    print(f"  ✗ Failed: {result['error']}")
+    finally:
+        if cache:
+            cache.save()
+    return results
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for extracted images
+Each distinct picture is written once as <hash>.<ext>; names.json maps
+the per-deck image names onto those objects
+"""
+import fcntl
+import hashlib
+import json
+import os
+from pathlib import Path
+
+NAME_MAP = "names.json"
+
+
+def content_hash(data):
+    """Fast 128-bit BLAKE2b hex digest of a bytes-like object"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def load_json(path):
+    """Return the JSON object stored at path, or {} if there is none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_merged(path, data, keys):
+    """Write data[key] for each of keys into the JSON object at path
+
+    Several extractor processes may share one file, so under a lock the
+    file is re-read and only the given keys are replaced (or removed when
+    missing from data). A key may be a tuple naming a nested key. The
+    write is atomic. Returns the merged object.
+    """
+    path = Path(path)
+    with open(path.with_name(f".{path.name}.lock"), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged = load_json(path)
+        for key in keys:
+            *parents, leaf = key if isinstance(key, tuple) else (key,)
+            source, target = data, merged
+            for parent in parents:
+                source = source.get(parent, {})
+                target = target.setdefault(parent, {})
+            if leaf in source:
+                target[leaf] = source[leaf]
+            else:
+                target.pop(leaf, None)
+
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    return merged
+
+
+class ImageStore:
+    """Content-addressed image directory with a name map on top"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.map_path = self.root / NAME_MAP
+        self.names = load_json(self.map_path)
+        self._dirty = set()
+
+    def put(self, data, ext):
+        """Store data (bytes or memoryview) and return (object name, is_new)
+
+        Identical content is only written once. New objects go through a
+        temporary file and an atomic rename, so a crash never leaves a
+        truncated object behind.
+        """
+        name = f"{content_hash(data)}.{ext}"
+        path = self.root / name
+        if path.exists() and path.stat().st_size == len(data):
+            return name, False
+
+        tmp_path = path.with_name(f".{name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return name, True
+
+    def put_stream(self, stream, ext, chunk_size=1024 * 1024):
+        """Store the content of a readable binary stream; see put
+
+        The stream is copied to a temporary file in chunks and hashed on
+        the way, so only one chunk is ever held in memory.
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        size = 0
+        tmp_path = self.root / f".incoming.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+
+        name = f"{hasher.hexdigest()}.{ext}"
+        path = self.root / name
+        if path.exists() and path.stat().st_size == size:
+            os.remove(tmp_path)
+            return name, False
+        os.replace(tmp_path, path)
+        return name, True
+
+    def forget(self, deck):
+        """Drop the names recorded for deck before it is extracted again"""
+        self.names.pop(deck, None)
+        self._dirty.add(deck)
+
+    def add_name(self, deck, label, name):
+        """Map label (e.g. image_001.jpg) in deck to a stored object"""
+        self.names.setdefault(deck, {})[label] = name
+        self._dirty.add(deck)
+
+    def resolve(self, deck, label):
+        """Return the path of a named image, or None"""
+        name = self.names.get(deck, {}).get(label)
+        return self.root / name if name else None
+
+    def save(self):
+        """Write the decks changed here into the name map"""
+        self.names = save_merged(self.map_path, self.names, self._dirty)
+        self._dirty.clear()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Responsive image variants for the generated pages
+Each source image is resized to a few widths in WebP across a process
+pool and gets a tiny blurred placeholder; results are cached by source
+content hash, so a rebuild only touches images that changed
+"""
+import argparse
+import base64
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from image_carver import mapped
+from image_store import content_hash, load_json, save_merged
+from slideshow_renderer import list_images
+
+VARIANTS_DIR = "images_web"
+VARIANT_INDEX = "variants.json"
+WIDTHS = (480, 960, 1600)
+QUALITY = 80
+PLACEHOLDER_INDEX = "placeholders.json"
+PLACEHOLDER_SIZE = 16
+# Placeholders are decoded at 4x their size and box-averaged down
+PLACEHOLDER_SAMPLE = 4
+PLACEHOLDER_BATCH = 256
+
+
+def _make_variants(src_path, src_hash, out_dir, widths, quality):
+    """Write the WebP variants of one image; runs in a worker process
+
+    Returns (width, height, [(variant width, file name)]).
+    """
+    out_dir = Path(out_dir)
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+        # Never upscale: widths past the original collapse into one
+        # variant at the original width
+        targets = sorted({min(w, width) for w in widths})
+        variants = []
+        for target in targets:
+            name = f"{src_hash}-{target}.webp"
+            path = out_dir / name
+            if not path.exists():
+                resized = img if target == width else img.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS)
+                tmp_path = path.with_name(f".{name}.{os.getpid()}.tmp")
+                resized.save(tmp_path, 'WEBP', quality=quality, method=4)
+                os.replace(tmp_path, path)
+            variants.append((target, name))
+    return width, height, variants
+
+
+class VariantIndex:
+    """Variants per source image, kept in images_web/variants.json
+
+    Keyed by source path; each entry records the stat fingerprint and
+    content hash of the source, its dimensions and its variant files.
+    """
+
+    def __init__(self, out_dir=VARIANTS_DIR):
+        self.root = Path(out_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / VARIANT_INDEX
+        self.images = load_json(self.path)
+        self._dirty = set()
+
+    def source_hash(self, src_path):
+        """Return the content hash of src_path; an unchanged file (same
+        size and mtime as recorded) is not re-read
+        """
+        st = os.stat(src_path)
+        entry = self.images.get(src_path)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['hash']
+        with mapped(src_path) as mm:
+            return content_hash(mm)
+
+    def lookup(self, src_path, params):
+        """Return (entry or None, source hash) for src_path
+
+        A changed file whose content hash and parameters match the
+        recorded ones is still reused.
+        """
+        st = os.stat(src_path)
+        entry = self.images.get(src_path)
+        src_hash = self.source_hash(src_path)
+        if entry and entry['hash'] == src_hash and entry['params'] == params and all(
+                (self.root / name).exists() for _, name in entry['variants']):
+            if entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns:
+                self.record(src_path, src_hash, params, entry['width'], entry['height'],
+                            entry['variants'])
+            return entry, src_hash
+        return None, src_hash
+
+    def record(self, src_path, src_hash, params, width, height, variants):
+        st = os.stat(src_path)
+        self.images[src_path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                                 'hash': src_hash, 'params': params,
+                                 'width': width, 'height': height,
+                                 'variants': [list(v) for v in variants]}
+        self._dirty.add(src_path)
+
+    def save(self):
+        self.images = save_merged(self.path, self.images, self._dirty)
+        self._dirty.clear()
+
+
+def build_variants(image_paths, out_dir=VARIANTS_DIR, widths=WIDTHS, quality=QUALITY, workers=None):
+    """Create the variants of every image that needs them
+
+    Returns {source path: {'width', 'height', 'variants': [(width, path)]}}
+    with variant paths relative to the same directory as the sources.
+    """
+    index = VariantIndex(out_dir)
+    params = f"webp:q{quality}:" + ','.join(str(w) for w in sorted(widths))
+    pending = {}
+    for src_path in image_paths:
+        entry, src_hash = index.lookup(src_path, params)
+        if entry is None:
+            pending[src_path] = src_hash
+
+    if pending:
+        print(f"Resizing {len(pending)} of {len(image_paths)} images...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_make_variants, src_path, src_hash, out_dir, widths, quality): src_path
+                       for src_path, src_hash in pending.items()}
+            for future in as_completed(futures):
+                src_path = futures[future]
+                try:
+                    width, height, variants = future.result()
+                except Exception as e:
+                    print(f"  ✗ Error resizing {src_path}: {e}")
+                    continue
+                index.record(src_path, pending[src_path], params, width, height, variants)
+                print(f"  ✓ {src_path} ({len(variants)} variants)")
+    index.save()
+
+    results = {}
+    for src_path in image_paths:
+        entry = index.images.get(src_path)
+        if entry and entry['params'] == params:
+            results[src_path] = {
+                'width': entry['width'],
+                'height': entry['height'],
+                'variants': [(w, (index.root / name).as_posix()) for w, name in entry['variants']],
+            }
+    return results
+
+
+def _sample_pixels(src_path, size):
+    """Decode an image straight to a size x size RGB array"""
+    with Image.open(src_path) as img:
+        # JPEGs are decoded at a reduced scale, which is most of the saving
+        img.draft('RGB', (size, size))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        return np.asarray(img.resize((size, size), Image.BILINEAR))
+
+
+def _encode_placeholder(pixels):
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def build_placeholders(image_paths, out_dir=VARIANTS_DIR, size=PLACEHOLDER_SIZE):
+    """Return {source path: data URI} with a tiny preview of each image
+
+    Previews are size x size (stretched back to the image's box by the
+    browser, where they are blurred) and cached by source content hash
+    in placeholders.json. New images are downscaled in batches: decoded
+    small, stacked into one array and box-averaged together with NumPy.
+    """
+    index = VariantIndex(out_dir)
+    cache_path = index.root / PLACEHOLDER_INDEX
+    cache = load_json(cache_path)
+    hashes = {src_path: index.source_hash(src_path) for src_path in image_paths}
+    pending = list({src_hash: src_path for src_path, src_hash in hashes.items()
+                    if src_hash not in cache}.items())
+
+    sample = size * PLACEHOLDER_SAMPLE
+    for start in range(0, len(pending), PLACEHOLDER_BATCH):
+        batch = []
+        for src_hash, src_path in pending[start:start + PLACEHOLDER_BATCH]:
+            try:
+                batch.append((src_hash, _sample_pixels(src_path, sample)))
+            except Exception as e:
+                print(f"  ✗ Error reading {src_path}: {e}")
+        if not batch:
+            continue
+        pixels = np.stack([p for _, p in batch]).astype(np.float32)
+        # Mean of every PLACEHOLDER_SAMPLE x PLACEHOLDER_SAMPLE block, for
+        # the whole batch in one reduction
+        small = pixels.reshape(len(batch), size, PLACEHOLDER_SAMPLE,
+                               size, PLACEHOLDER_SAMPLE, 3).mean(axis=(2, 4))
+        small = np.rint(small).astype(np.uint8)
+        for (src_hash, _), preview in zip(batch, small):
+            cache[src_hash] = _encode_placeholder(preview)
+    if pending:
+        cache = save_merged(cache_path, cache, [src_hash for src_hash, _ in pending])
+
+    return {src_path: cache[src_hash] for src_path, src_hash in hashes.items()
+            if src_hash in cache}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Create responsive WebP variants of the site images')
+    parser.add_argument('dirs', nargs='*', default=['images', 'images_ruralidays'],
+                        help='Image folders (default: images images_ruralidays)')
+    parser.add_argument('--output', '-o', default=VARIANTS_DIR, help='Variants folder')
+    parser.add_argument('--widths', type=int, nargs='+', default=list(WIDTHS),
+                        help='Variant widths in pixels')
+    parser.add_argument('--quality', type=int, default=QUALITY, help='WebP quality')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Worker processes (default: all cores)')
+
+    args = parser.parse_args()
+
+    sources = [path for folder in args.dirs for path in list_images(folder)]
+    results = build_variants(sources, args.output, args.widths, args.quality, args.jobs)
+    placeholders = build_placeholders(sources, args.output)
+
+    original = sum(os.path.getsize(path) for path in results)
+    smallest = sum(os.path.getsize(info['variants'][0][1]) for info in results.values())
+    print(f"\n{len(results)} images: {original / 1e6:.1f} MB originals, "
+          f"{smallest / 1e6:.1f} MB at the smallest width, "
+          f"{sum(map(len, placeholders.values())) / 1e3:.1f} KB of placeholders")
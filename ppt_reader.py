@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Native reader for binary PowerPoint (.ppt) files
+Opens the OLE2 compound file, reads pictures straight from the OfficeArt
+BLIP store in the "Pictures" stream and slide text from the record tree
+of the "PowerPoint Document" stream
+"""
+import mmap
+import os
+import struct
+import zlib
+
+CFB_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+# Directory entry object types
+STORAGE = 1
+STREAM = 2
+ROOT = 5
+
+# PowerPoint record types
+RT_DOCUMENT = 0x03E8
+RT_SLIDE = 0x03EE
+RT_SLIDE_ATOM = 0x03EF
+RT_NOTES = 0x03F0
+RT_SLIDE_PERSIST_ATOM = 0x03F3
+RT_PPDRAWING_GROUP = 0x040B
+RT_TEXT_HEADER_ATOM = 0x0F9F
+RT_TEXT_CHARS_ATOM = 0x0FA0
+RT_TEXT_BYTES_ATOM = 0x0FA8
+RT_SLIDE_LIST_WITH_TEXT = 0x0FF0
+RT_USER_EDIT_ATOM = 0x0FF5
+RT_PERSIST_DIRECTORY_ATOM = 0x1772
+
+# SlideListWithText instances
+SLWT_SLIDES = 0
+SLWT_NOTES = 2
+
+# TextHeaderAtom text types
+TEXT_TITLE = 0
+TEXT_NOTES = 2
+TEXT_CENTER_TITLE = 6
+
+# OfficeArt record types and the picture (pib) shape property
+RT_FOPT = 0xF00B
+RT_FBSE = 0xF007
+PROP_PIB = 0x0104
+BLIP_TYPES = {
+    0xF01A: 'emf',
+    0xF01B: 'wmf',
+    0xF01C: 'pict',
+    0xF01D: 'jpg',
+    0xF01E: 'png',
+    0xF01F: 'bmp',
+    0xF029: 'tiff',
+    0xF02A: 'jpg',  # CMYK JPEG
+}
+METAFILE_TYPES = {'emf', 'wmf', 'pict'}
+
+
+class CompoundFile:
+    """Minimal read-only OLE2 compound file (CFB) reader"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            if os.fstat(self._file.fileno()).st_size < 512:
+                raise ValueError("file too small for a compound file")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._parse_header()
+            self._entries = self._read_directory()
+            root = self._entries[0]
+            self._mini_stream = self._read_chain(root['start'], root['size'])
+            self._minifat = self._read_fat_chain(self._first_minifat)
+        except (struct.error, IndexError) as e:
+            self.close()
+            raise ValueError(f"corrupt compound file: {e}")
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mini_stream = None
+        if getattr(self, '_mm', None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Streams handed out as memoryviews keep the map alive
+                pass
+            self._mm = None
+        self._file.close()
+
+    def _parse_header(self):
+        """Read the 512-byte header and load the FAT through the DIFAT"""
+        (signature, _clsid, _minor, major, _byte_order, sector_shift,
+         mini_shift, _reserved, _n_dir, n_fat, first_dir, _transaction,
+         mini_cutoff, first_minifat, _n_minifat, first_difat,
+         n_difat) = struct.unpack_from('<8s16sHHHHH6sIIIIIIIII', self._mm, 0)
+
+        if signature != CFB_SIGNATURE:
+            raise ValueError("not an OLE2 compound file")
+        if sector_shift not in (9, 12):
+            raise ValueError(f"unsupported sector size 2**{sector_shift}")
+
+        self._major = major
+        self._sector_size = 1 << sector_shift
+        self._mini_sector_size = 1 << mini_shift
+        self._mini_cutoff = mini_cutoff
+        self._first_dir = first_dir
+        self._first_minifat = first_minifat
+
+        # The first 109 FAT sector numbers live in the header
+        per_sector = self._sector_size // 4
+        difat = list(struct.unpack_from('<109I', self._mm, 0x4C))
+        sector = first_difat
+        for _ in range(n_difat):
+            if sector in (ENDOFCHAIN, FREESECT):
+                break
+            entries = struct.unpack_from(f'<{per_sector}I', self._mm, self._offset(sector))
+            difat.extend(entries[:-1])
+            sector = entries[-1]
+
+        fat = []
+        for sector in difat[:n_fat]:
+            if sector == FREESECT:
+                continue
+            fat.extend(struct.unpack_from(f'<{per_sector}I', self._mm, self._offset(sector)))
+        self._fat = fat
+
+    def _offset(self, sector):
+        offset = (sector + 1) * self._sector_size
+        if offset >= len(self._mm):
+            raise ValueError(f"sector {sector} beyond end of file")
+        return offset
+
+    def _chain(self, start, fat):
+        """Yield the sector numbers of the chain starting at start"""
+        sector = start
+        for _ in range(len(fat) + 1):
+            if sector == ENDOFCHAIN:
+                return
+            if sector >= len(fat):
+                raise ValueError(f"broken sector chain at {sector}")
+            yield sector
+            sector = fat[sector]
+        raise ValueError("sector chain loops")
+
+    def _read_chain(self, start, size=None):
+        """Read a stream stored in regular sectors
+
+        A stream whose sectors are contiguous is returned as a zero-copy
+        memoryview of the mapped file; a fragmented one is joined.
+        """
+        sectors = list(self._chain(start, self._fat))
+        if not sectors:
+            return b''
+        if size is None:
+            size = len(sectors) * self._sector_size
+        first = self._offset(sectors[0])
+        if sectors == list(range(sectors[0], sectors[0] + len(sectors))):
+            return memoryview(self._mm)[first:first + size]
+        parts = []
+        for sector in sectors:
+            offset = self._offset(sector)
+            parts.append(self._mm[offset:offset + self._sector_size])
+        return b''.join(parts)[:size]
+
+    def _read_fat_chain(self, start):
+        """Read a chain of sectors holding 32-bit sector numbers (MiniFAT)"""
+        data = self._read_chain(start)
+        return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+    def _read_directory(self):
+        data = self._read_chain(self._first_dir)
+        entries = []
+        for offset in range(0, len(data) - 127, 128):
+            (name, name_len, obj_type, _color, left, right, child, _clsid,
+             _state, _ctime, _mtime, start, size) = struct.unpack_from(
+                '<64sHBBIII16sIQQIQ', data, offset)
+            if self._major == 3:
+                size &= 0xFFFFFFFF
+            entries.append({
+                'name': name[:max(name_len - 2, 0)].decode('utf-16-le', 'replace'),
+                'type': obj_type,
+                'left': left,
+                'right': right,
+                'child': child,
+                'start': start,
+                'size': size,
+            })
+        if not entries or entries[0]['type'] != ROOT:
+            raise ValueError("missing root directory entry")
+        return entries
+
+    def _children(self, index):
+        """Return the entries stored directly under storage index"""
+        children = []
+        stack = [self._entries[index]['child']]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node == NOSTREAM or node in seen or node >= len(self._entries):
+                continue
+            seen.add(node)
+            entry = self._entries[node]
+            children.append(entry)
+            stack.extend((entry['left'], entry['right']))
+        return children
+
+    def list_streams(self):
+        """Return the names of the streams in the root storage"""
+        return [e['name'] for e in self._children(0) if e['type'] == STREAM]
+
+    def open_stream(self, name):
+        """Return the content of a root-level stream"""
+        for entry in self._children(0):
+            if entry['type'] == STREAM and entry['name'] == name:
+                break
+        else:
+            raise KeyError(name)
+
+        if entry['size'] >= self._mini_cutoff:
+            return self._read_chain(entry['start'], entry['size'])
+
+        parts = []
+        for sector in self._chain(entry['start'], self._minifat):
+            offset = sector * self._mini_sector_size
+            parts.append(self._mini_stream[offset:offset + self._mini_sector_size])
+        return b''.join(parts)[:entry['size']]
+
+
+def _dib_to_bmp(dib):
+    """Prepend a BITMAPFILEHEADER to a bare DIB"""
+    header_size = struct.unpack_from('<I', dib, 0)[0]
+    if header_size == 12:
+        # BITMAPCOREHEADER: RGBTRIPLE palette
+        bit_count = struct.unpack_from('<H', dib, 10)[0]
+        palette = (1 << bit_count) * 3 if bit_count <= 8 else 0
+    else:
+        bit_count, compression = struct.unpack_from('<HI', dib, 14)
+        colors_used = struct.unpack_from('<I', dib, 32)[0]
+        if not colors_used and bit_count <= 8:
+            colors_used = 1 << bit_count
+        palette = colors_used * 4
+        if compression == 3 and header_size == 40:
+            palette += 12  # BI_BITFIELDS masks
+    pixel_offset = 14 + header_size + palette
+    return b'BM' + struct.pack('<IHHI', 14 + len(dib), 0, 0, pixel_offset) + dib
+
+
+def _parse_blip(stream, pos):
+    """Return (type, data) for the OfficeArt BLIP record at pos, or None"""
+    ver_inst, rec_type, rec_len = struct.unpack_from('<HHI', stream, pos)
+    img_type = BLIP_TYPES.get(rec_type)
+    if img_type is None:
+        return None
+
+    # Odd instances carry a second 16-byte UID
+    instance = ver_inst >> 4
+    data_pos = pos + 8 + 16 * (1 + (instance & 1))
+    end = pos + 8 + rec_len
+
+    if img_type in METAFILE_TYPES:
+        # OfficeArtMetafileHeader: cbSize, rcBounds, ptSize, cbSave, compression, filter
+        cb_save, compression = struct.unpack_from('<IB', stream, data_pos + 28)
+        data_pos += 34
+        data = stream[data_pos:min(data_pos + cb_save, end)]
+        if compression == 0:
+            data = zlib.decompress(data)
+        return img_type, data
+
+    # Bitmap BLIPs have a one-byte tag before the image data
+    data = stream[data_pos + 1:end]
+    if img_type == 'bmp':
+        data = _dib_to_bmp(data)
+    return img_type, data
+
+
+def iter_blips(stream):
+    """Yield (type, offset, data) for every BLIP in a Pictures stream"""
+    pos = 0
+    size = len(stream)
+    while pos + 8 <= size:
+        _, rec_type, rec_len = struct.unpack_from('<HHI', stream, pos)
+        end = pos + 8 + rec_len
+        if end > size:
+            raise ValueError(f"truncated BLIP record at offset {pos:,}")
+
+        blip_pos = pos
+        if rec_type == RT_FBSE:
+            # A file BLIP store entry may embed its BLIP after the name
+            cb_name = stream[pos + 8 + 33]
+            blip_pos = pos + 8 + 36 + cb_name
+            if blip_pos + 8 > end:
+                pos = end
+                continue
+
+        blip = _parse_blip(stream, blip_pos)
+        if blip is not None:
+            yield blip[0], blip_pos, blip[1]
+        pos = end
+
+
+def iter_records(stream, start=0, end=None, recurse=True):
+    """Yield (instance, type, body start, body end) for the records in
+    stream[start:end] in document order, descending into containers
+    unless recurse is False
+    """
+    end = len(stream) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        ver_inst, rec_type, rec_len = struct.unpack_from('<HHI', stream, pos)
+        body = pos + 8
+        body_end = body + rec_len
+        if body_end > end:
+            return
+        yield ver_inst >> 4, rec_type, body, body_end
+        if recurse and ver_inst & 0xF == 0xF:
+            yield from iter_records(stream, body, body_end)
+        pos = body_end
+
+
+def _record_at(stream, offset):
+    """Return (type, body start, body end) of the record at offset"""
+    _, rec_type, rec_len = struct.unpack_from('<HHI', stream, offset)
+    return rec_type, offset + 8, offset + 8 + rec_len
+
+
+def _clean_text(text):
+    # Paragraphs end in CR, line breaks inside one are vertical tabs
+    return text.replace('\r', '\n').replace('\x0b', '\n').strip()
+
+
+def iter_texts(stream, start, end):
+    """Yield (text type, text) for the TextCharsAtom/TextBytesAtom records
+    in stream[start:end], typed by the TextHeaderAtom before each
+    """
+    text_type = None
+    for _, rec_type, body, body_end in iter_records(stream, start, end):
+        if rec_type == RT_TEXT_HEADER_ATOM:
+            text_type = struct.unpack_from('<I', stream, body)[0]
+        elif rec_type in (RT_TEXT_CHARS_ATOM, RT_TEXT_BYTES_ATOM):
+            raw = bytes(stream[body:body_end])
+            if rec_type == RT_TEXT_CHARS_ATOM:
+                text = raw.decode('utf-16-le', 'replace')
+            else:
+                text = raw.decode('latin-1')
+            text = _clean_text(text)
+            if text:
+                yield text_type, text
+
+
+def _picture_refs(stream, start, end):
+    """Return the 1-based BLIP store indexes of the pictures in a drawing"""
+    refs = []
+    for count, rec_type, body, _ in iter_records(stream, start, end):
+        if rec_type != RT_FOPT:
+            continue
+        for pos in range(body, body + 6 * count, 6):
+            opid, value = struct.unpack_from('<HI', stream, pos)
+            # pib is a BLIP id property: fBid set, fComplex clear
+            if opid & 0x3FFF == PROP_PIB and opid & 0x4000 and value:
+                refs.append(value)
+    return refs
+
+
+def _persist_directory(doc, current_user):
+    """Return ({persist id: stream offset}, document persist id)
+
+    Follows the UserEditAtom chain from the Current User stream; newer
+    edits take precedence over older ones.
+    """
+    offset = struct.unpack_from('<I', current_user, 16)[0]
+    persist = {}
+    doc_ref = None
+    seen = set()
+    while offset and offset not in seen:
+        seen.add(offset)
+        rec_type, body, _ = _record_at(doc, offset)
+        if rec_type != RT_USER_EDIT_ATOM:
+            raise ValueError(f"no UserEditAtom at offset {offset:,}")
+        (_last_slide, _version, _minor, _major, last_edit, directory,
+         doc_persist) = struct.unpack_from('<IHBBIII', doc, body)
+        if doc_ref is None:
+            doc_ref = doc_persist
+
+        rec_type, pos, dir_end = _record_at(doc, directory)
+        if rec_type != RT_PERSIST_DIRECTORY_ATOM:
+            raise ValueError(f"no PersistDirectoryAtom at offset {directory:,}")
+        while pos + 4 <= dir_end:
+            entry = struct.unpack_from('<I', doc, pos)[0]
+            first, count = entry & 0xFFFFF, entry >> 20
+            offsets = struct.unpack_from(f'<{count}I', doc, pos + 4)
+            for i, value in enumerate(offsets):
+                persist.setdefault(first + i, value)
+            pos += 4 + 4 * count
+        offset = last_edit
+    return persist, doc_ref
+
+
+def _slide_list(doc, start, end):
+    """Return [(persist id, slide id, [(text type, text)])] for a SlideListWithText"""
+    slides = []
+    for _, rec_type, body, body_end in iter_records(doc, start, end, recurse=False):
+        if rec_type == RT_SLIDE_PERSIST_ATOM:
+            persist_ref, _flags, _texts, slide_id = struct.unpack_from('<IIiI', doc, body)
+            slides.append((persist_ref, slide_id, []))
+        elif slides:
+            slides[-1][2].extend(iter_texts(doc, body - 8, body_end))
+    return slides
+
+
+def iter_slides(doc, current_user):
+    """Yield a dict (title, text, notes, pictures) for every slide in order
+
+    Walks only the records needed: the persist directory, the document's
+    slide lists and BLIP store, and each slide and notes container.
+    pictures holds Pictures stream offsets of the BLIPs the slide shows.
+    """
+    persist, doc_ref = _persist_directory(doc, current_user)
+    rec_type, doc_start, doc_end = _record_at(doc, persist[doc_ref])
+    if rec_type != RT_DOCUMENT:
+        raise ValueError("document persist object is not a Document record")
+
+    slide_lists = {}
+    blip_offsets = []
+    for instance, rec_type, body, body_end in iter_records(doc, doc_start, doc_end, recurse=False):
+        if rec_type == RT_SLIDE_LIST_WITH_TEXT:
+            slide_lists[instance] = _slide_list(doc, body, body_end)
+        elif rec_type == RT_PPDRAWING_GROUP:
+            for _, child_type, child_body, _ in iter_records(doc, body, body_end):
+                if child_type == RT_FBSE:
+                    # foDelay: offset of the BLIP in the Pictures stream
+                    blip_offsets.append(struct.unpack_from('<I', doc, child_body + 28)[0])
+
+    notes_by_id = {slide_id: (persist_ref, texts)
+                   for persist_ref, slide_id, texts in slide_lists.get(SLWT_NOTES, [])}
+
+    for persist_ref, _slide_id, outline in slide_lists.get(SLWT_SLIDES, []):
+        rec_type, start, end = _record_at(doc, persist[persist_ref])
+        if rec_type != RT_SLIDE:
+            continue
+
+        texts = list(outline)
+        notes_id = None
+        for _, child_type, body, _ in iter_records(doc, start, end, recurse=False):
+            if child_type == RT_SLIDE_ATOM:
+                notes_id = struct.unpack_from('<I', doc, body + 16)[0]
+        for item in iter_texts(doc, start, end):
+            if item[1] not in (text for _, text in texts):
+                texts.append(item)
+
+        notes = []
+        if notes_id in notes_by_id:
+            notes_ref, notes_texts = notes_by_id[notes_id]
+            notes = [text for _, text in notes_texts]
+            if notes_ref in persist:
+                notes_type, notes_start, notes_end = _record_at(doc, persist[notes_ref])
+                if notes_type == RT_NOTES:
+                    notes.extend(text for text_type, text in iter_texts(doc, notes_start, notes_end)
+                                 if text_type == TEXT_NOTES and text not in notes)
+
+        slide_content = {
+            'title': '',
+            'text': [],
+            'notes': '\n'.join(notes),
+            'pictures': [blip_offsets[ref - 1] for ref in _picture_refs(doc, start, end)
+                         if ref <= len(blip_offsets)],
+        }
+        for text_type, text in texts:
+            if text_type in (TEXT_TITLE, TEXT_CENTER_TITLE) and not slide_content['title']:
+                slide_content['title'] = text
+        for text_type, text in texts:
+            if text == slide_content['title'] or text_type == TEXT_NOTES:
+                continue
+            # Same rule as the other readers for slides without a title placeholder
+            if not slide_content['title'] and len(text) < 100:
+                slide_content['title'] = text
+            else:
+                slide_content['text'].append(text)
+        yield slide_content
+
+
+def read_deck(ppt_path, store=None):
+    """Read slide text and pictures of a .ppt in one pass over its streams
+
+    Returns (slides_data, pictures): slide dicts (title, text, notes,
+    images) and the (type, offset, data) BLIP records. images lists each
+    slide's Pictures stream offsets; with an ImageStore the pictures a
+    slide shows are stored and images lists their file paths instead.
+    Raises ValueError if the deck cannot be read.
+    """
+    with CompoundFile(ppt_path) as cfb:
+        try:
+            doc = cfb.open_stream('PowerPoint Document')
+            current_user = cfb.open_stream('Current User')
+        except KeyError as e:
+            raise ValueError(f"missing stream {e}")
+        try:
+            pictures_stream = cfb.open_stream('Pictures')
+        except KeyError:
+            pictures_stream = b''
+
+    try:
+        pictures = list(iter_blips(pictures_stream))
+        slides_data = list(iter_slides(doc, current_user))
+    except (struct.error, IndexError, KeyError, zlib.error) as e:
+        raise ValueError(f"corrupt PowerPoint document: {e}")
+
+    by_offset = {pos: (img_type, data) for img_type, pos, data in pictures}
+    stored = {}
+    for slide in slides_data:
+        slide['images'] = []
+        for offset in slide.pop('pictures'):
+            if offset not in by_offset:
+                continue
+            if store is None:
+                slide['images'].append(offset)
+                continue
+            if offset not in stored:
+                img_type, data = by_offset[offset]
+                stored[offset] = (store.root / store.put(data, img_type)[0]).as_posix()
+            slide['images'].append(stored[offset])
+    return slides_data, pictures
+
+
+def read_pictures(ppt_path):
+    """Return (type, offset, data) for every picture in the deck's BLIP store
+
+    Offsets are relative to the Pictures stream. Raises ValueError if the
+    file is not a readable compound file or the BLIP store is corrupt.
+    """
+    with CompoundFile(ppt_path) as cfb:
+        try:
+            # Usually a memoryview of the mapped file, so the BLIP data
+            # below is sliced without copying
+            stream = cfb.open_stream('Pictures')
+        except KeyError:
+            return []
+    try:
+        return list(iter_blips(stream))
+    except (struct.error, IndexError, zlib.error) as e:
+        raise ValueError(f"corrupt BLIP store: {e}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <file.ppt>")
+        sys.exit(1)
+
+    slides_data, pictures = read_deck(sys.argv[1])
+    for number, slide in enumerate(slides_data, 1):
+        print(f"Slide {number}: {slide['title']}")
+        for text in slide['text']:
+            print(f"    {text}")
+        if slide['notes']:
+            print(f"    Notes: {slide['notes']}")
+        if slide['images']:
+            print(f"    Pictures at offsets {slide['images']}")
+    print()
+    for img_type, pos, data in pictures:
+        print(f"  {img_type:5s} at offset {pos:,} ({len(data):,} bytes)")
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Local preview server for the site
+Serves the build output with ETags, conditional GETs, byte ranges and
+the precompressed .br/.gz files, resizes images on demand (?w=800)
+through an LRU disk cache, and reloads open pages when files change
+"""
+import argparse
+import email.utils
+import gzip
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from image_store import content_hash
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CACHE_DIR = ".preview_cache"
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (b"<script>new EventSource('" + RELOAD_PATH.encode() +
+                 b"').onmessage = () => location.reload();</script>")
+RESIZABLE = ('.jpg', '.jpeg', '.png', '.webp')
+MIN_WIDTH = 16
+MAX_WIDTH = 4096
+# publish.py file names carry a 12-digit content hash
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 256 * 1024
+
+
+class ResizeCache:
+    """Resized images on disk, evicted least recently used first once
+    they take more than max_bytes
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=256 * 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> (path, size), oldest use first. Use order is only kept in
+        # memory: file mtimes feed the ETag and Last-Modified of resized
+        # responses, so they are left alone and a restart starts from
+        # creation order
+        self.entries = OrderedDict()
+        self.total = 0
+        files = [p for p in self.root.iterdir() if p.is_file() and not p.name.startswith('.')]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime_ns):
+            size = path.stat().st_size
+            self.entries[path.stem] = (path, size)
+            self.total += size
+
+    def get(self, src_path, width):
+        """Return the path of src_path resized to width (never upscaled)"""
+        st = os.stat(src_path)
+        key = content_hash(f"{src_path}:{st.st_size}:{st.st_mtime_ns}:{width}".encode('utf-8'))
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+
+        path = self.root / f"{key}{Path(src_path).suffix.lower()}"
+        with Image.open(src_path) as img:
+            img = ImageOps.exif_transpose(img)
+            if width < img.width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            if path.suffix in ('.jpg', '.jpeg') and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+            img.save(tmp_path, format=Image.registered_extensions()[path.suffix], quality=85)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if key not in self.entries:
+                size = path.stat().st_size
+                self.entries[key] = (path, size)
+                self.total += size
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                _, (old_path, old_size) = self.entries.popitem(last=False)
+                self.total -= old_size
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+        return path
+
+
+class ChangeWatcher:
+    """Polls the watched folders and bumps a version when any file changes"""
+
+    def __init__(self, paths, interval=1.0):
+        self.paths = [Path(p) for p in paths]
+        self.interval = interval
+        self.version = 0
+        self.changed = threading.Condition()
+        self._snapshot = self.snapshot()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def snapshot(self):
+        state = {}
+        stack = list(self.paths)
+        while stack:
+            path = stack.pop()
+            if path.is_file():
+                st = path.stat()
+                state[str(path)] = (st.st_size, st.st_mtime_ns)
+                continue
+            try:
+                entries = list(os.scandir(path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name == '__pycache__':
+                    continue
+                if entry.is_dir():
+                    stack.append(Path(entry.path))
+                else:
+                    st = entry.stat()
+                    state[entry.path] = (st.st_size, st.st_mtime_ns)
+        return state
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            snapshot = self.snapshot()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                with self.changed:
+                    self.version += 1
+                    self.changed.notify_all()
+
+    def wait(self, version, timeout):
+        """Block until the version moves past version; True if it did"""
+        with self.changed:
+            return self.changed.wait_for(lambda: self.version != version, timeout)
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    server_version = "PrioritaPreview/1.0"
+    # Keep-alive, as on a real host
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.serve(head_only=False)
+
+    def do_HEAD(self):
+        self.serve(head_only=True)
+
+    def serve(self, head_only):
+        url = urlsplit(self.path)
+        if url.path == RELOAD_PATH:
+            return self.stream_reloads()
+
+        path = self.translate_path(url.path)
+        if os.path.isdir(path):
+            if not url.path.endswith('/'):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header('Location', url.path + '/')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            path = os.path.join(path, 'index.html')
+        if not os.path.isfile(path):
+            return self.send_error(HTTPStatus.NOT_FOUND)
+
+        width = parse_qs(url.query).get('w')
+        if width and Image is not None and path.lower().endswith(RESIZABLE):
+            try:
+                width = min(max(int(width[0]), MIN_WIDTH), MAX_WIDTH)
+            except ValueError:
+                return self.send_error(HTTPStatus.BAD_REQUEST, "w must be a number")
+            path = str(self.server.resize_cache.get(path, width))
+
+        if path.endswith('.html'):
+            self.serve_html(path, head_only)
+        else:
+            self.serve_file(path, head_only)
+
+    def cache_headers(self, path, etag, mtime):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(mtime, usegmt=True))
+        if HASHED_NAME_RE.search(path):
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        else:
+            self.send_header('Cache-Control', 'no-cache')
+
+    def not_modified(self, etag, mtime):
+        """True (and a 304 sent) if the client's copy is current"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            fresh = if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+        else:
+            since = self.headers.get('If-Modified-Since')
+            try:
+                fresh = since is not None and int(mtime) <= email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                fresh = False
+        if fresh:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+        return fresh
+
+    def precompressed(self, path, encodings=ENCODINGS):
+        """Return (encoding, file) for the precompressed sibling of path
+        written by publish.py that the client accepts, or (None, path)
+        """
+        accepted = self.headers.get('Accept-Encoding', '')
+        for name, suffix in encodings:
+            if name in accepted and os.path.isfile(path + suffix):
+                return name, path + suffix
+        return None, path
+
+    def serve_html(self, path, head_only):
+        """HTML is small: read it whole, add the reload hook, hash it
+
+        Where publish.py wrote .br/.gz siblings the page goes out with the
+        same Content-Encoding as on the host; the reload hook must go into
+        the page first, so it is compressed here rather than read from the
+        sibling.
+        """
+        with open(path, 'rb') as f:
+            body = f.read()
+        index = body.rfind(b'</body>')
+        body = body[:index] + RELOAD_SCRIPT + body[index:] if index != -1 else body + RELOAD_SCRIPT
+        encoding, _ = self.precompressed(path, [(name, suffix) for name, suffix in ENCODINGS
+                                                if name != 'br' or brotli is not None])
+        if encoding == 'br':
+            body = brotli.compress(body)
+        elif encoding == 'gzip':
+            body = gzip.compress(body, mtime=0)
+        etag = f'"{content_hash(body)}"'
+        mtime = os.stat(path).st_mtime
+        if self.not_modified(etag, mtime):
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if os.path.isfile(path + '.gz') or os.path.isfile(path + '.br'):
+            self.send_header('Vary', 'Accept-Encoding')
+        self.cache_headers(path, etag, mtime)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def serve_file(self, path, head_only):
+        source = path
+        content_type = self.guess_type(path)
+        encoding = None
+        if not self.headers.get('Range'):
+            # Serve the precompressed sibling written by publish.py
+            encoding, path = self.precompressed(path)
+
+        st = os.stat(path)
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        if self.not_modified(etag, st.st_mtime):
+            return
+
+        status = HTTPStatus.OK
+        start, end = 0, st.st_size
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        match = RANGE_RE.match(range_header.strip()) if range_header else None
+        # A stale If-Range or a range form not handled here gets the whole file
+        if match and any(match.groups()) and (if_range is None or if_range.strip() == etag):
+            if match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)) + 1, st.st_size)
+            else:
+                start = max(st.st_size - int(match.group(2)), 0)
+            if start >= end:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f"bytes */{st.st_size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header('Content-Range', f"bytes {start}-{end - 1}/{st.st_size}")
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if os.path.isfile(source + '.gz') or os.path.isfile(source + '.br'):
+            self.send_header('Vary', 'Accept-Encoding')
+        self.cache_headers(source, etag, st.st_mtime)
+        self.end_headers()
+        if head_only:
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def stream_reloads(self):
+        """Server-sent events: one 'reload' message after the next change"""
+        watcher = self.server.watcher
+        version = watcher.version
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            while not watcher.wait(version, timeout=15):
+                # Keeps the connection open through proxies and sleeps
+                self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+            self.wfile.write(b"data: reload\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+def make_server(root, port=8000, cache_size=256 * 1024 * 1024, watch=()):
+    """Return a threading server for root; call serve_forever() on it"""
+    root = os.path.abspath(root)
+
+    def handler(*args, **kwargs):
+        return PreviewHandler(*args, directory=root, **kwargs)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.resize_cache = ResizeCache(os.path.join(root, CACHE_DIR), cache_size)
+    server.watcher = ChangeWatcher([root, *watch])
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Preview the site locally')
+    parser.add_argument('root', nargs='?', default='dist' if os.path.isdir('dist') else '.',
+                        help='Folder to serve (default: dist/ if it exists, else .)')
+    parser.add_argument('--port', '-p', type=int, default=8000, help='Port')
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help='Resize cache limit in MB')
+    parser.add_argument('--watch', '-w', nargs='*', default=[],
+                        help='Extra source folders whose changes reload the page')
+
+    args = parser.parse_args()
+
+    if Image is None:
+        print("Pillow not installed: ?w= resizing is disabled")
+    server = make_server(args.root, args.port, args.cache_size * 1024 * 1024, args.watch)
+    print(f"Serving {args.root}/ at http://127.0.0.1:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
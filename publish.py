@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Publish the static site into dist/
+Every asset the pages use gets a content-hashed file name and every
+reference to it is rewritten, so assets can be cached forever; text
+files are also written precompressed (gzip, and brotli when available)
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from urllib.parse import quote
+
+from image_carver import mapped
+from image_store import content_hash, load_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = "dist"
+PAGES = ('index.html', 'dossier.html')
+ASSET_DIRS = ('images', 'images_ruralidays', 'images_web', 'images_all')
+GALLERY_DIR = "gallery"
+ASSET_MANIFEST = "asset-manifest.json"
+HASH_LENGTH = 12
+COMPRESSIBLE = ('.html', '.css', '.js', '.json', '.svg')
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+
+def hashed_name(path, digest):
+    """Return the published path: folder/<slug>.<hash>.<ext>"""
+    path = Path(path)
+    slug = re.sub(r'[^a-z0-9]+', '-', path.stem.lower()).strip('-') or 'asset'
+    return (path.parent / f"{slug}.{digest[:HASH_LENGTH]}{path.suffix.lower()}").as_posix()
+
+
+def find_assets(asset_dirs=ASSET_DIRS):
+    """Return the publishable files in asset_dirs (indexes and dot files excluded)"""
+    assets = []
+    for folder in asset_dirs:
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            if entry.is_file() and not entry.name.startswith('.') and not entry.name.endswith('.json'):
+                assets.append(f"{folder}/{entry.name}")
+    return sorted(assets)
+
+
+def reference_pattern(assets):
+    """Compile one regex matching any asset path, plain or URL-encoded
+
+    Longer paths come first so no path matches a prefix of another.
+    With no assets the pattern never matches, so nothing is rewritten.
+    """
+    spellings = {}
+    for asset in assets:
+        spellings[asset] = asset
+        spellings[quote(asset)] = asset
+    if not spellings:
+        # An empty alternation would match '' everywhere
+        return re.compile(r'(?!)'), spellings
+    pattern = re.compile('|'.join(re.escape(s) for s in sorted(spellings, key=len, reverse=True)))
+    return pattern, spellings
+
+
+def write_output(path, data, compress=True):
+    """Write data (bytes) atomically, plus .gz/.br siblings for text types"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    outputs = [(path, data)]
+    if compress and path.suffix in COMPRESSIBLE:
+        outputs.append((path.with_name(path.name + '.gz'), gzip.compress(data, 9, mtime=0)))
+        if brotli is not None:
+            outputs.append((path.with_name(path.name + '.br'), brotli.compress(data)))
+    for target, content in outputs:
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, target)
+
+
+def publish_asset(asset, dist):
+    """Copy one asset to its hashed name (hard link when possible)"""
+    with mapped(asset) as mm:
+        published = hashed_name(asset, content_hash(mm))
+    target = Path(dist) / published
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(asset, target)
+        except OSError:
+            shutil.copy2(asset, target)
+    return published
+
+
+def publish(pages=PAGES, asset_dirs=ASSET_DIRS, dist=DIST_DIR):
+    """Publish pages and the assets they reference into dist
+
+    Returns the asset manifest {source path: published path}.
+    """
+    dist = Path(dist)
+    pattern, spellings = reference_pattern(find_assets(asset_dirs))
+
+    # Gallery pages are loaded by script, so their paths count as references too
+    texts = {page: Path(page).read_text(encoding='utf-8') for page in pages if os.path.exists(page)}
+    gallery_index = load_json(Path(GALLERY_DIR) / "index.json")
+    for name in gallery_index.get('pages', []):
+        texts[f"{GALLERY_DIR}/{name}"] = (Path(GALLERY_DIR) / name).read_text(encoding='utf-8')
+    if gallery_index:
+        texts[f"{GALLERY_DIR}/index.json"] = json.dumps(gallery_index, ensure_ascii=False,
+                                                        separators=(',', ':'))
+
+    referenced = sorted({spellings[m] for text in texts.values() for m in pattern.findall(text)})
+    manifest = {asset: publish_asset(asset, dist) for asset in referenced}
+    print(f"Published {len(manifest)} assets")
+
+    def rewrite(text):
+        return pattern.sub(lambda m: manifest[spellings[m.group(0)]], text)
+
+    # Gallery pages become immutable too; the index keeps its name and
+    # points at them
+    if gallery_index:
+        pages_out = []
+        for name in gallery_index['pages']:
+            data = rewrite(texts.pop(f"{GALLERY_DIR}/{name}")).encode('utf-8')
+            published = hashed_name(f"{GALLERY_DIR}/{name}", content_hash(data))
+            write_output(dist / published, data)
+            manifest[f"{GALLERY_DIR}/{name}"] = published
+            pages_out.append(Path(published).name)
+        index = json.loads(rewrite(texts.pop(f"{GALLERY_DIR}/index.json")))
+        index['pages'] = pages_out
+        write_output(dist / GALLERY_DIR / "index.json",
+                     json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    for page, text in texts.items():
+        write_output(dist / page, rewrite(text).encode('utf-8'))
+        print(f"  ✓ {page}")
+
+    write_output(dist / ASSET_MANIFEST, json.dumps(manifest, indent=2, ensure_ascii=False,
+                                                   sort_keys=True).encode('utf-8'), compress=False)
+    write_cache_headers(dist, asset_dirs)
+    return manifest
+
+
+def write_cache_headers(dist, asset_dirs=ASSET_DIRS):
+    """Write vercel.json: hashed folders are immutable, the rest revalidates"""
+    headers = [{'source': f"/{folder}/(.*)", 'headers': [{'key': 'Cache-Control', 'value': IMMUTABLE}]}
+               for folder in asset_dirs]
+    headers.append({'source': f"/{GALLERY_DIR}/page-(.*)",
+                    'headers': [{'key': 'Cache-Control', 'value': IMMUTABLE}]})
+    for source in ['/', '/(.*)\\.html', f"/{GALLERY_DIR}/index.json"]:
+        headers.append({'source': source, 'headers': [{'key': 'Cache-Control', 'value': REVALIDATE}]})
+    write_output(Path(dist) / "vercel.json",
+                 json.dumps({'headers': headers}, indent=2).encode('utf-8'), compress=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Publish the site with fingerprinted, precompressed assets')
+    parser.add_argument('pages', nargs='*', default=list(PAGES),
+                        help='HTML pages to publish (default: index.html dossier.html)')
+    parser.add_argument('--output', '-o', default=DIST_DIR, help='Output folder')
+
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli not installed: writing gzip only (pip install brotli)")
+    manifest = publish(args.pages, ASSET_DIRS, args.output)
+    print(f"\n✓ Published to {args.output}/ ({len(manifest)} fingerprinted files)")
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Shared Reveal.js renderer for dossier.html
+Templates are built once at import and the page is streamed to disk
+slide by slide, so memory use stays flat however large the gallery is
+
+With offline=True the page is self-contained instead: reveal.js is
+vendored and inlined, its stylesheets are pruned to the rules the
+generated markup can use and inlined, and the HTML is minified, so
+first paint needs a single request and the deck works without network
+"""
+import html
+import os
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+
+from critical_css import UsedNames, minify_html, prune_css
+
+REVEAL_VERSION = "4.3.1"
+REVEAL_CDN = f"https://cdn.jsdelivr.net/npm/reveal.js@{REVEAL_VERSION}/dist"
+REVEAL_FILES = ('reveal.js', 'reveal.css', 'theme/white.css')
+VENDOR_DIR = f"vendor/reveal.js-{REVEAL_VERSION}"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+DOSSIER_CSS = '''        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+            background: #f5f5f5;
+        }
+
+        .reveal {
+            width: 100%;
+            height: 100vh;
+        }
+
+        .reveal .slides section {
+            text-align: center;
+            padding: 20px;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+        }
+
+        .reveal .slides section.text-slide {
+            display: block;
+            text-align: left;
+        }
+
+        .reveal h1 {
+            color: #2c5530;
+            font-size: 3em;
+            margin-bottom: 0.5em;
+            border-bottom: 3px solid #4a7c59;
+            padding-bottom: 0.3em;
+        }
+
+        .reveal h2 {
+            color: #2c5530;
+            font-size: 2.5em;
+            margin-bottom: 0.8em;
+        }
+
+        .reveal img {
+            max-width: 100%;
+            max-height: 85vh;
+            object-fit: contain;
+            border-radius: 8px;
+            box-shadow: 0 4px 20px rgba(0,0,0,0.1);
+        }
+
+        .reveal .text-slide img {
+            max-height: 60vh;
+        }
+
+        .reveal img.placeholder {
+            filter: blur(12px);
+        }
+
+        .reveal .progress {
+            color: #4a7c59;
+        }
+
+        .reveal .controls {
+            color: #4a7c59;
+        }
+
+        .title-slide {
+            background: linear-gradient(135deg, #2c5530 0%, #4a7c59 100%);
+            color: white;
+        }
+
+        .title-slide h1, .title-slide h2 {
+            color: white;
+            border-bottom: 3px solid rgba(255,255,255,0.3);
+        }
+
+        @media (max-width: 768px) {
+            .reveal .slides section {
+                padding: 10px;
+            }
+
+            .reveal h1 {
+                font-size: 2em;
+            }
+
+            .reveal h2 {
+                font-size: 1.8em;
+            }
+        }
+'''
+
+PAGE_HEAD = Template('''<!DOCTYPE html>
+<html lang="$lang">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$page_title</title>
+$stylesheets
+</head>
+<body>
+    <div class="reveal">
+        <div class="slides">
+            <!-- Title Slide -->
+            <section class="title-slide">
+                <h1>$title</h1>
+                <h2>$subtitle</h2>
+                <p style="margin-top: 2em; font-size: 1.5em;">
+                    Galería de Imágenes
+                </p>
+                <p style="font-size: 1em; margin-top: 2em; opacity: 0.9;">
+                    $image_count imágenes • Use las flechas para navegar
+                </p>
+            </section>
+
+''')
+
+PAGE_TAIL = Template('''        </div>
+    </div>
+
+$reveal_script
+    <script>
+        Reveal.initialize({
+            hash: true,
+            controls: true,
+            progress: true,
+            center: true,
+            touch: true,
+            transition: 'slide',
+            backgroundTransition: 'fade'
+        });
+
+        // Reveal loads data-src for the slides near the current one; once
+        // it has, switch those images to their responsive srcset
+        function loadSrcset() {
+            document.querySelectorAll('.reveal img[data-srcset]:not([data-src])').forEach(img => {
+                img.srcset = img.dataset.srcset;
+                img.removeAttribute('data-srcset');
+            });
+        }
+        Reveal.on('ready', loadSrcset);
+        Reveal.on('slidechanged', loadSrcset);
+
+        // Drop the blur once the real image replaces the placeholder
+        document.addEventListener('load', event => {
+            const img = event.target;
+            if (img.tagName === 'IMG' && !img.currentSrc.startsWith('data:')) {
+                img.classList.remove('placeholder');
+            }
+        }, true);
+    </script>
+</body>
+</html>
+''')
+
+TEXT_SLIDE_OPEN = '            <section class="text-slide">\n'
+SLIDE_CLOSE = '            </section>\n'
+HEADING = '                <h2>{}</h2>\n'
+PARAGRAPH = '                <p>{}</p>\n'
+TEXT_IMAGE = '                <img {}>\n'
+IMAGE_SLIDE = '''            <section>
+                <img {}>
+            </section>
+'''
+IMAGE_SIZES = "100vw"
+TEXT_IMAGE_SIZES = "(max-width: 768px) 100vw, 50vw"
+
+CDN_STYLESHEETS = f'''    <link rel="stylesheet" href="{REVEAL_CDN}/reveal.css">
+    <link rel="stylesheet" href="{REVEAL_CDN}/theme/white.css">
+    <style>
+{DOSSIER_CSS}    </style>'''
+CDN_SCRIPT = f'    <script src="{REVEAL_CDN}/reveal.js"></script>'
+
+
+def vendor_reveal(vendor_dir=VENDOR_DIR):
+    """Return {file name: text} for REVEAL_FILES, downloading into
+    vendor_dir only the files that are not there yet
+    """
+    assets = {}
+    for name in REVEAL_FILES:
+        path = Path(vendor_dir) / name
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            print(f"Vendoring {REVEAL_CDN}/{name} into {vendor_dir}/")
+            with urllib.request.urlopen(f"{REVEAL_CDN}/{name}", timeout=30) as response:
+                data = response.read()
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        assets[name] = path.read_text(encoding='utf-8')
+    return assets
+
+
+@lru_cache(maxsize=None)
+def offline_page(vendor_dir=VENDOR_DIR):
+    """Return (head, tail, reveal_script, stylesheets) for the
+    self-contained page; built once per process
+
+    Slides are rendered from the fixed fragment templates, so the classes
+    and tags the page can contain are known before any slide is written.
+    """
+    assets = vendor_reveal(vendor_dir)
+    used = UsedNames()
+    used.add_html(''.join([PAGE_HEAD.template, PAGE_TAIL.template, TEXT_SLIDE_OPEN, SLIDE_CLOSE,
+                           HEADING, PARAGRAPH, IMAGE_SLIDE,
+                           TEXT_IMAGE.format(img_attrs('a.jpg', placeholders={'a.jpg': 'data:,'}))]))
+    used.add_script(assets['reveal.js'])
+    used.add_script(PAGE_TAIL.template)
+    css = prune_css('\n'.join([assets['reveal.css'], assets['theme/white.css'], DOSSIER_CSS]), used)
+    # The script is inlined verbatim apart from anything that would close the tag
+    script = assets['reveal.js'].replace('</script', '<\\/script')
+    return (Template(minify_html(PAGE_HEAD.template)), Template(minify_html(PAGE_TAIL.template)),
+            f"<script>{script}</script>", f"<style>{css}</style>")
+
+
+def list_images(images_dir):
+    """Return the image paths in images_dir, sorted by file name"""
+    images_dir = Path(images_dir)
+    if not images_dir.is_dir():
+        return []
+    return [(images_dir / name).as_posix() for name in sorted(
+        entry.name for entry in os.scandir(images_dir)
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS))]
+
+
+def img_attrs(image, variants=None, sizes=IMAGE_SIZES, placeholders=None):
+    """Return the attributes of a lazily loaded <img> for image
+
+    Reveal.js only loads data-src for slides near the current one, so
+    nothing else is fetched up front. With an image_variants entry the
+    smallest variant loads first and the browser then picks a width from
+    srcset; width/height reserve the space. A placeholder data URI is
+    shown blurred until then.
+    """
+    alt = html.escape(Path(image).name)
+    placeholder = placeholders.get(image) if placeholders else None
+    attrs = f'src="{placeholder}" class="placeholder" ' if placeholder else ''
+    info = variants.get(image) if variants else None
+    if not info:
+        return f'{attrs}data-src="{html.escape(image)}" alt="{alt}"'
+    srcset = ', '.join(f"{html.escape(path)} {width}w" for width, path in info['variants'])
+    return (f'{attrs}data-src="{html.escape(info["variants"][0][1])}" data-srcset="{srcset}" '
+            f'sizes="{sizes}" width="{info["width"]}" height="{info["height"]}" alt="{alt}"')
+
+
+def render_text_slide(slide, variants=None, placeholders=None):
+    """Return the HTML of one slide dict (title, text, images)"""
+    parts = [TEXT_SLIDE_OPEN]
+    title = slide.get('title', '')
+    if title:
+        parts.append(HEADING.format(html.escape(title)))
+    for text in slide.get('text', []):
+        if text and text != title:
+            # Split long text into paragraphs
+            for para in text.split('\n'):
+                if para.strip():
+                    parts.append(PARAGRAPH.format(html.escape(para.strip())))
+    for image in slide.get('images', []):
+        parts.append(TEXT_IMAGE.format(img_attrs(image, variants, TEXT_IMAGE_SIZES, placeholders)))
+    parts.append(SLIDE_CLOSE)
+    return ''.join(parts)
+
+
+def render_image_slide(image, variants=None, placeholders=None):
+    """Return the HTML of a slide showing one image"""
+    return IMAGE_SLIDE.format(img_attrs(image, variants, IMAGE_SIZES, placeholders))
+
+
+def iter_slides(slides_data=(), image_paths=(), variants=None, placeholders=None):
+    """Yield the HTML of each slide of the merged deck
+
+    Text slides come first in deck order; every image they do not
+    already show follows on a slide of its own.
+    """
+    shown = set()
+    for slide in slides_data:
+        shown.update(os.path.normpath(image) for image in slide.get('images', []))
+        yield render_text_slide(slide, variants, placeholders)
+    for image in image_paths:
+        if os.path.normpath(image) not in shown:
+            yield render_image_slide(image, variants, placeholders)
+
+
+def write_dossier(output_path, slides_data=(), image_paths=(), title="Finca La Priorita",
+                  subtitle="Dossier 2022", lang="es", variants=None, placeholders=None,
+                  offline=False):
+    """Stream the merged Reveal.js deck to output_path
+
+    variants maps image paths to their image_variants.build_variants
+    entries and placeholders maps them to preview data URIs; see
+    img_attrs. offline selects the self-contained, minified page. The
+    page goes to a temporary file first and replaces output_path
+    atomically. Returns the number of slides written after the title.
+    """
+    image_count = len({os.path.normpath(image) for image in image_paths} |
+                      {os.path.normpath(image) for slide in slides_data
+                       for image in slide.get('images', [])})
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    if offline:
+        head, tail, reveal_script, stylesheets = offline_page()
+    else:
+        head, tail, reveal_script, stylesheets = PAGE_HEAD, PAGE_TAIL, CDN_SCRIPT, CDN_STYLESHEETS
+    slide_count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(head.substitute(
+            lang=lang, page_title=html.escape(f"{title} - {subtitle}"), stylesheets=stylesheets,
+            title=html.escape(title), subtitle=html.escape(subtitle), image_count=image_count))
+        for slide_html in iter_slides(slides_data, image_paths, variants, placeholders):
+            f.write(minify_html(slide_html) if offline else slide_html)
+            slide_count += 1
+        f.write(tail.substitute(reveal_script=reveal_script))
+    os.replace(tmp_path, output_path)
+    return slide_count
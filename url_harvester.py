@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Single-pass image URL harvester for listing pages
+A streaming tokenizer built on a few precompiled patterns collects image
+URLs from img/source attributes, srcset, inline scripts (JSON included)
+and absolute URLs anywhere else in the markup, as the page arrives and
+without building a document tree; only the unfinished tail of the page
+is ever buffered
+"""
+import argparse
+import html
+import re
+import time
+import tracemalloc
+
+IMAGE_ATTRS = frozenset(['src', 'data-src', 'data-lazy-src', 'data-original', 'data-full', 'data-image'])
+SRCSET_ATTRS = frozenset(['srcset', 'data-srcset'])
+_EXT = r'\.(?:jpg|jpeg|png|webp)(?:\?[^\s"\'<>]*)?'
+ABSOLUTE_URL_RE = re.compile(r'https?://[^\s"\'<>]+' + _EXT, re.I)
+# In scripts relative paths count too. Every pattern starts with a
+# literal character, which the regex engine skips to quickly; a scheme
+# in front of a path is picked up afterwards
+PATH_URL_RE = re.compile(r'/[^\s"\'<>]+' + _EXT, re.I)
+# The tag events: a script opening or an image tag
+_TOKEN_RE = re.compile(r'<(?:(?P<script>script)\b[^>]*>|(?P<tag>img|source)\b(?P<attrs>[^>]*)>)', re.I)
+_SCRIPT_END_RE = re.compile(r'</script\s*>', re.I)
+_ATTR_RE = re.compile(r'([^\s=/>]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+# srcset as the HTML spec parses it: a URL runs up to whitespace, and a
+# candidate ends at the first comma after its descriptors (outside
+# parentheses) or with the comma that ends its URL
+_SRCSET_URL_RE = re.compile(r'[\s,]*(\S+)')
+_SRCSET_DESCRIPTORS_RE = re.compile(r'(?:[^,(]|\([^)]*\)?)*,?')
+# A URL never spans a quote, whitespace or angle bracket, so text is safe
+# to scan up to the last of them; script text stops short of '<' so an
+# end tag is never split
+_TEXT_CUT_RE = re.compile(r'.*[\s"\'<>]', re.S)
+_SCRIPT_CUT_RE = re.compile(r'.*["\'\s]', re.S)
+
+
+class ImageURLHarvester:
+    """Collects image URLs into self.urls as markup is fed"""
+
+    def __init__(self):
+        self.urls = set()
+        self._buffer = ''
+        self._in_script = False
+
+    def feed(self, data):
+        self._buffer += data
+        self._scan(final=False)
+
+    def close(self):
+        self._scan(final=True)
+        self._buffer = ''
+
+    def _scan(self, final):
+        buf = self._buffer
+        pos = 0
+        while True:
+            if self._in_script:
+                end = _SCRIPT_END_RE.search(buf, pos)
+                if end:
+                    self._script(buf[pos:end.start()])
+                    pos = end.end()
+                    self._in_script = False
+                    continue
+                cut = len(buf) if final else _cut(_SCRIPT_CUT_RE, buf, pos)
+                self._script(buf[pos:cut])
+                pos = cut
+                break
+
+            limit = len(buf) if final else _cut(_TEXT_CUT_RE, buf, pos)
+            # A '<' with no '>' after it may be an unfinished tag
+            last_open = buf.rfind('<', pos, limit)
+            if not final and last_open >= 0 and buf.find('>', last_open) < 0:
+                limit = last_open
+            match = _TOKEN_RE.search(buf, pos, limit)
+            # Text and other tags before the event may hold absolute URLs
+            self._absolute_urls(buf, pos, match.start() if match else limit)
+            if match is None:
+                pos = limit
+                break
+            pos = match.end()
+            if match.group('script'):
+                self._in_script = True
+            else:
+                self._image_tag(match.group('attrs'))
+        self._buffer = buf[pos:]
+
+    def _absolute_urls(self, buf, start, end):
+        i = buf.find('://', start, end)
+        while i >= 0:
+            for scheme_start in (i - 5, i - 4):
+                if scheme_start >= start and buf[scheme_start:i].lower() in ('https', 'http'):
+                    match = ABSOLUTE_URL_RE.match(buf, scheme_start, end)
+                    if match:
+                        self.urls.add(match.group(0))
+                    break
+            i = buf.find('://', i + 3, end)
+
+    def _image_tag(self, attrs):
+        for name, *values in _ATTR_RE.findall(attrs):
+            value = ''.join(values)
+            if not value:
+                continue
+            if '&' in value:
+                value = html.unescape(value)
+            name = name.lower()
+            if name in IMAGE_ATTRS:
+                self.urls.add(value)
+            elif name in SRCSET_ATTRS:
+                self.urls.update(srcset_urls(value))
+            elif 'http' in value:
+                self.urls.update(ABSOLUTE_URL_RE.findall(value))
+
+    def _script(self, source):
+        if '/' not in source:
+            return
+        # Inline JSON escapes slashes as \/
+        source = source.replace('\\/', '/')
+        for match in PATH_URL_RE.finditer(source):
+            url = match.group(0)
+            start = match.start()
+            if url.startswith('//'):
+                for scheme in ('https:', 'http:'):
+                    if source[max(0, start - len(scheme)):start].lower() == scheme:
+                        url = scheme + url
+                        break
+            self.urls.add(url)
+
+
+def srcset_urls(value):
+    """Return the candidate URLs of a srcset attribute value, in order"""
+    urls = []
+    pos = 0
+    while True:
+        match = _SRCSET_URL_RE.match(value, pos)
+        if match is None:
+            return urls
+        url = match.group(1)
+        pos = match.end()
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            pos = _SRCSET_DESCRIPTORS_RE.match(value, pos).end()
+        if url:
+            urls.append(url)
+
+
+def _cut(pattern, buf, pos):
+    match = pattern.match(buf, pos)
+    return match.end() if match else pos
+
+
+def harvest(chunks):
+    """Return the set of image URLs in an HTML document given as an
+    iterable of text chunks
+    """
+    parser = ImageURLHarvester()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.urls
+
+
+def _soup_harvest(markup):
+    """The tree-based extraction harvest replaces, for the benchmark"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(markup, 'html.parser')
+    urls = set()
+    for script in soup.find_all('script'):
+        if script.string:
+            urls.update(re.findall(r'https?://[^\s"\'<>]+' + _EXT, script.string, re.I))
+            urls.update(re.findall(r'/[^\s"\'<>]+' + _EXT, script.string, re.I))
+    for img in soup.find_all('img'):
+        for attr in IMAGE_ATTRS:
+            if img.get(attr):
+                urls.add(img.get(attr))
+    urls.update(re.findall(r'https?://[^\s"\'<>]+' + _EXT, markup, re.I))
+    return urls
+
+
+def _measure(func, markup, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        urls = func(markup)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    func(markup)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return urls, elapsed, peak
+
+
+def _chunked(markup, size=64 * 1024):
+    return (markup[i:i + size] for i in range(0, len(markup), size))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Harvest image URLs from saved listing pages')
+    parser.add_argument('pages', nargs='+', help='Saved HTML pages')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare time and peak memory with the BeautifulSoup extraction')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per page when benchmarking')
+
+    args = parser.parse_args()
+
+    for page in args.pages:
+        with open(page, encoding='utf-8', errors='replace') as f:
+            markup = f.read()
+        if not args.benchmark:
+            for url in sorted(harvest(_chunked(markup))):
+                print(url)
+            continue
+
+        urls, elapsed, peak = _measure(lambda h: harvest(_chunked(h)), markup, args.repeat)
+        print(f"{page} ({len(markup) / 1e6:.1f} MB)")
+        print(f"  harvest: {elapsed * 1000:8.1f} ms {peak / 1e6:8.1f} MB peak  {len(urls)} URLs")
+        try:
+            soup_urls, soup_elapsed, soup_peak = _measure(_soup_harvest, markup, args.repeat)
+        except ImportError:
+            print("  bs4 not installed: nothing to compare with")
+            continue
+        print(f"  soup:    {soup_elapsed * 1000:8.1f} ms {soup_peak / 1e6:8.1f} MB peak  {len(soup_urls)} URLs")
+        print(f"  {soup_elapsed / elapsed:.1f}x faster, {soup_peak / max(peak, 1):.1f}x less memory"
+              + ("" if soup_urls <= urls else f"; {len(soup_urls - urls)} URLs only soup found"))